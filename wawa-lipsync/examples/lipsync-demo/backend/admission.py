@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Optional, Sequence
+from metrics import LoopLagMonitor
+
+logger = logging.getLogger(__name__)
+
+# Per-client rate ceilings stepped through, in order, while the server is overloaded
+RATE_STEPS = (30, 15, 10)
+
+class AdmissionController:
+    """
+    Load shedding for the tracking server.
+    Connections are counted from admit() to release(), so a burst of handshakes
+    cannot get past max_clients before any of them is registered; at that hard
+    cap new connections are refused straight away. While the event loop lags
+    more than max_lag, the per-client rate cap steps down first (30 -> 15 ->
+    10 Hz by default), at most once per step_interval; new connections are
+    refused only if the loop still lags once the lowest rate is in force.
+    The cap is lifted again one step at a time after recover_after seconds
+    of comfortable load. Load is sampled by sample(), every interval once
+    start() is called.
+    """
+
+    def __init__(self, loop_lag: LoopLagMonitor,
+                 apply_rate_cap: Callable[[Optional[float]], None], pipeline_fps: float = 30,
+                 max_lag: float = 0.1, max_clients: int = 0, rate_steps: Sequence[float] = RATE_STEPS,
+                 step_interval: float = 2.0, recover_after: float = 10.0, retry_after: int = 5):
+        self.loop_lag = loop_lag
+        self.apply_rate_cap = apply_rate_cap
+        self.max_lag = max_lag
+        self.max_clients = max_clients
+        # Level 0 is uncapped; steps at or above the pipeline rate would change nothing
+        self.caps = [None] + [fps for fps in rate_steps if fps < pipeline_fps]
+        self.step_interval = step_interval
+        self.recover_after = recover_after
+        self.retry_after = retry_after
+        self.level = 0
+        self.shedding = False
+        self.connections = 0
+        self.rejected = 0
+        self._peak_lag = 0.0
+        self._last_step = 0.0
+        self._calm_since = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def rate_cap(self) -> Optional[float]:
+        return self.caps[self.level]
+
+    @property
+    def full(self) -> bool:
+        """True at the hard client limit."""
+        return bool(self.max_clients) and self.connections >= self.max_clients
+
+    def admit(self) -> Optional[int]:
+        """
+        Decide on a new connection: None to accept it (the caller must call
+        release() when it ends), otherwise the number of seconds the client
+        should wait before retrying.
+        """
+        if self.full or self.shedding:
+            self.rejected += 1
+            return self.retry_after
+        self.connections += 1
+        return None
+
+    def release(self):
+        """An admitted connection ended."""
+        self.connections = max(0, self.connections - 1)
+
+    def sample(self):
+        """Take the worst loop lag since the last sample and react to it."""
+        self._peak_lag = self.loop_lag.take_peak()
+        self.evaluate()
+
+    def evaluate(self):
+        """Step the rate cap down or up according to the last lag sample."""
+        now = time.monotonic()
+        if self._peak_lag > self.max_lag:
+            self._calm_since = None
+            # Refuse newcomers only once the lowest rate was already in force and did not help
+            self.shedding = self.level == len(self.caps) - 1
+            if not self.shedding and now - self._last_step >= self.step_interval:
+                self._set_level(self.level + 1, now)
+            return
+
+        self.shedding = False
+        if self._peak_lag >= self.max_lag / 2 or self.level == 0:
+            self._calm_since = None
+            return
+        if self._calm_since is None:
+            self._calm_since = now
+        elif now - self._calm_since >= self.recover_after:
+            self._calm_since = now
+            self._set_level(self.level - 1, now)
+
+    def _set_level(self, level: int, now: float):
+        self.level = level
+        self._last_step = now
+        cap = self.rate_cap
+        logger.warning(f"Load level {level}: client rate cap {cap or 'lifted'} "
+                       f"(loop lag {self._peak_lag * 1000:.0f} ms, {self.connections} clients)")
+        self.apply_rate_cap(cap)
+
+    def start(self, interval: float = 0.5):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.sample()
+
+    def stats(self) -> Dict:
+        """Current load level for health checks and metrics."""
+        return {
+            'level': self.level,
+            'rate_cap': self.rate_cap,
+            'shedding': self.shedding,
+            'connections': self.connections,
+            'rejected_connections': self.rejected
+        }
@@ -3,71 +3,409 @@ import json
 import logging
 import os
 from aiohttp import web, WSMsgType
-from simple_face_tracker import SimpleFaceTracker
-from avatar_controller import AvatarController
+from tracking_hub import TrackingHub, SlowConsumerError
+from frame_scheduler import parse_rate
+from wire_format import SUBPROTOCOLS, DELTA_PROTOCOL, is_binary
+from frame_ingest import FrameIngestSession, MAX_MESSAGE_BYTES
+from detection_scheduler import DetectionScheduler
+import metrics
+from simple_face_tracker import warm_up
+import face_detectors
+from multi_face import tracker_factory_from_env
+from cpu_budget import CpuBudget
+from admission import AdmissionController
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# SSE and polling are plain HTTP, so browsers on other origins need CORS
+CORS_HEADERS = {'Access-Control-Allow-Origin': '*'}
+
 class TrackingServer:
-    def __init__(self, host='0.0.0.0', port=None):
+    """
+    Single-port tracking server.
+    Health checks, WebSocket, Server-Sent Events and long-polling are all
+    served by one aiohttp app and fed from the same shared pose stream.
+    """
+    
+    def __init__(self, host='0.0.0.0', port=None, fps=None, bus_name=None, reuse_port=False):
         self.host = host
         self.port = port or int(os.environ.get('PORT', 8765))
+        # Worker processes share the port (SO_REUSEPORT) and read poses from a PoseBus
+        self.reuse_port = reuse_port
+        self.fps = fps or float(os.environ.get('TRACKING_FPS', 30))
+        self.delta_resolution = float(os.environ.get('TRACKING_DELTA_RESOLUTION', 0.1))
+        if self.delta_resolution <= 0:
+            raise ValueError(f"TRACKING_DELTA_RESOLUTION must be positive, got {self.delta_resolution}")
+        self.max_client_lag = float(os.environ.get('TRACKING_MAX_CLIENT_LAG', 2.0))
+        self.ingest_fps = float(os.environ.get('TRACKING_INGEST_FPS', self.fps))
+        self.poll_timeout = 25.0
         self.clients = set()
+        self.ingest_sessions = set()
+        self.bus_name = bus_name
+        # Before any detection threads exist: sets OpenCV's thread count and optional pinning
+        self.cpu = CpuBudget.shared()
+        self.hub = TrackingHub.shared()
+        self.hub.tracker_factory = tracker_factory_from_env()
+        self.detection = DetectionScheduler.shared()
+        self.loop_lag = metrics.LoopLagMonitor()
+        # Above this loop lag or connection count, client rates step down and new clients are refused
+        self.admission = AdmissionController(
+            self.loop_lag, self._apply_rate_cap, pipeline_fps=self.fps,
+            max_lag=float(os.environ.get('TRACKING_MAX_LOOP_LAG_MS', 100)) / 1000,
+            max_clients=int(os.environ.get('TRACKING_MAX_CLIENTS', 0))
+        )
+        self.hub.set_rate(self.fps)
+        if bus_name:
+            self.hub.use_pose_bus(bus_name)
         self.app = web.Application()
         self.setup_routes()
     
     def setup_routes(self):
         """Set up HTTP routes."""
         self.app.router.add_get('/health', self.health_check)
-        self.app.router.add_get('/', self.health_check)
+        self.app.router.add_get('/', self.root_handler)
         self.app.router.add_get('/ws', self.websocket_handler)
+        self.app.router.add_get('/events', self.events_handler)
+        self.app.router.add_get('/poll', self.poll_handler)
+        self.app.router.add_get('/ingest', self.ingest_handler)
+        self.app.router.add_get('/metrics', self.metrics_handler)
     
     async def health_check(self, request):
         """Handle health check requests."""
+        # A failing tracker is restarted in the background; report it until it recovers
         return web.json_response({
-            "status": "healthy",
+            "status": "degraded" if self.hub.error else "healthy",
             "service": "aisha-eye-tracking",
-            "websocket_endpoint": f"ws://{self.host}:{self.port}/ws"
+            "websocket_endpoint": f"ws://{self.host}:{self.port}/ws",
+            "sse_endpoint": f"http://{self.host}:{self.port}/events",
+            "poll_endpoint": f"http://{self.host}:{self.port}/poll",
+            "ingest_endpoint": f"ws://{self.host}:{self.port}/ingest",
+            "metrics_endpoint": f"http://{self.host}:{self.port}/metrics",
+            "pipeline": self.hub.stats(),
+            "clients": [
+                {"id": subscription.id, "protocol": subscription.protocol, **subscription.stats()}
+                for subscription in self.hub.subscribers
+            ],
+            "admission": self.admission.stats(),
+            "detector": {
+                "backend": face_detectors.default_detector().name,
+                "benchmark": face_detectors.benchmark_results
+            },
+            "detection": self.detection.stats(),
+            "cpu": self.cpu.stats()
+        })
+    
+    async def root_handler(self, request):
+        """WebSocket upgrades on / (legacy clients) or a health check."""
+        if request.headers.get('Upgrade', '').lower() == 'websocket':
+            return await self.websocket_handler(request)
+        return await self.health_check(request)
+    
+    def _apply_rate_cap(self, fps):
+        self.hub.set_rate_cap(fps)
+        for session in self.ingest_sessions:
+            session.set_rate_cap(fps)
+    
+    def _busy_response(self, retry_after):
+        return web.json_response(
+            {"error": "server busy", "retry_after": retry_after}, status=503,
+            headers={'Retry-After': str(retry_after), **CORS_HEADERS}
+        )
+    
+    async def _refuse_websocket(self, request, retry_after):
+        # Browsers cannot read a failed handshake, so accept and close with 1013 (Try Again Later)
+        ws = web.WebSocketResponse(protocols=SUBPROTOCOLS)
+        ws.headers['Retry-After'] = str(retry_after)
+        await ws.prepare(request)
+        await ws.close(code=1013, message=f'Server busy, retry after {retry_after}s'.encode())
+        return ws
+    
+    def _subscribe(self, request, protocol=None):
+        # Clients may ask for a lower rate with ?fps=
+        client_fps = parse_rate(request.query.get('fps'), self.fps, self.fps)
+        subscription = self.hub.subscribe(
+            fps=client_fps, protocol=protocol, resolution=self.delta_resolution,
+            max_lag=self.max_client_lag
+        )
+        subscription.transport = request.transport
+        return subscription
+    
+    async def metrics_handler(self, request):
+        """Per-stage latency histograms and pipeline gauges in Prometheus text format."""
+        pipeline = self.hub.scheduler.stats()
+        detection = self.detection.stats()
+        subscribers = list(self.hub.subscribers)
+        body = metrics.render(
+            gauges={
+                'tracking_target_fps': ('gauge', 'Configured pipeline frame rate.', pipeline['target_fps']),
+                'tracking_achieved_fps': ('gauge', 'Pipeline frames produced over the last second.', pipeline['achieved_fps']),
+                'tracking_skipped_frames_total': ('counter', 'Pipeline frames skipped after falling behind.', pipeline['skipped_frames']),
+                'tracking_dropped_frames_total': ('counter', 'Frames replaced before a slow client sent them.', self.hub.dropped_total),
+                'tracking_detection_expired_frames_total': ('counter', 'Uploaded frames dropped after their detection deadline.', detection['expired']),
+                'tracking_connected_clients': ('gauge', 'Open WebSocket, SSE and upload connections.', len(self.clients)),
+                'tracking_event_loop_lag_current_seconds': ('gauge', 'Most recent event-loop lag sample.', self.loop_lag.lag),
+                'tracking_load_level': ('gauge', 'Load-shedding level (0 = full rate).', self.admission.level),
+                'tracking_client_rate_cap': ('gauge', 'Per-client rate cap under load (0 = none).', self.admission.rate_cap or 0),
+                'tracking_rejected_connections_total': ('counter', 'Connections refused while shedding load.', self.admission.rejected)
+            },
+            client_gauges={
+                'tracking_client_pending_frames': (
+                    'Frames waiting in the client slot (0 or 1).',
+                    {subscription.id: subscription.pending_frames for subscription in subscribers}
+                ),
+                'tracking_client_send_buffer_bytes': (
+                    'Bytes queued in the client socket write buffer.',
+                    {subscription.id: subscription.send_buffer_bytes for subscription in subscribers}
+                ),
+                'tracking_client_lag_seconds': (
+                    'Publish-to-send lag of the last frame sent to the client.',
+                    {subscription.id: subscription.lag for subscription in subscribers}
+                ),
+                'tracking_client_sent_frames': (
+                    'Frames sent to the client since it connected.',
+                    {subscription.id: subscription.sent for subscription in subscribers}
+                ),
+                'tracking_client_dropped_frames': (
+                    'Frames replaced before they were sent to the client.',
+                    {subscription.id: subscription.dropped for subscription in subscribers}
+                ),
+                'tracking_client_suppressed_frames': (
+                    'Unchanged frames skipped by the client delta stream.',
+                    {subscription.id: subscription.suppressed for subscription in subscribers}
+                )
+            },
+            loop_lag=self.loop_lag
+        )
+        return web.Response(text=body, headers={
+            'Content-Type': 'text/plain; version=0.0.4; charset=utf-8',
+            'Cache-Control': 'no-store'
         })
     
     async def websocket_handler(self, request):
         """Handle WebSocket connections."""
-        ws = web.WebSocketResponse()
+        retry_after = self.admission.admit()
+        if retry_after is not None:
+            return await self._refuse_websocket(request, retry_after)
+        try:
+            return await self._serve_websocket(request)
+        finally:
+            self.admission.release()
+    
+    async def _serve_websocket(self, request):
+        # Binary frames are opt-in through a subprotocol; plain clients keep JSON
+        ws = web.WebSocketResponse(protocols=SUBPROTOCOLS)
         await ws.prepare(request)
+        protocol = ws.ws_protocol
+        send = ws.send_bytes if is_binary(protocol) else ws.send_str
         
         self.clients.add(ws)
         logger.info(f"New client connected. Total clients: {len(self.clients)}")
         
-        tracker = SimpleFaceTracker()
-        controller = AvatarController()
+        subscription = self._subscribe(request, protocol)
+        
+        # Push mode: frames stream at the target rate regardless of inbound traffic,
+        # while control messages are handled by a separate reader task
+        streaming = asyncio.Event()
+        streaming.set()
+        producer = asyncio.create_task(self._push_frames(ws, subscription, send, streaming))
+        reader = asyncio.create_task(self._read_messages(ws, subscription, streaming))
+        
+        try:
+            await asyncio.wait({producer, reader}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (producer, reader):
+                task.cancel()
+            await asyncio.gather(producer, reader, return_exceptions=True)
+            self.clients.discard(ws)
+            self.hub.unsubscribe(subscription)
+            if not ws.closed:
+                await ws.close()
+            logger.info(f"Client disconnected. Total clients: {len(self.clients)}")
+        
+        return ws
+    
+    async def _push_frames(self, ws, subscription, send, streaming):
+        """Producer: stream poses to the client at its target rate."""
+        try:
+            while not ws.closed:
+                await streaming.wait()
+                
+                # Send the newest pose; stale ones are dropped, not queued
+                await subscription.send_next(send)
+        except SlowConsumerError as e:
+            logger.warning(f"Disconnecting slow client: {e}")
+            await ws.close(code=1013, message=b'Client too slow')
+        except ConnectionResetError:
+            pass
+        except Exception as e:
+            logger.error(f"Error: {e}")
+    
+    async def _read_messages(self, ws, subscription, streaming):
+        """
+        Reader: handle control messages from the client.
+        Accepts 'close' and JSON commands:
+          {"type": "rate", "fps": 15}  change this client's frame rate
+          {"type": "unsubscribe"}      pause the stream
+          {"type": "subscribe"}        resume the stream
+        """
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT:
+                if msg.data == 'close':
+                    await ws.close()
+                    break
+                self._handle_command(msg.data, subscription, streaming)
+            elif msg.type == WSMsgType.ERROR:
+                logger.error(f'WebSocket error: {ws.exception()}')
+    
+    def _handle_command(self, data, subscription, streaming):
+        """Apply a JSON control message; anything else is ignored."""
+        try:
+            command = json.loads(data)
+        except ValueError:
+            return
+        if not isinstance(command, dict):
+            return
+        
+        kind = command.get('type')
+        if kind == 'rate':
+            fps = parse_rate(command.get('fps'), self.fps, self.fps)
+            self.hub.set_client_rate(subscription, fps)
+        elif kind == 'subscribe':
+            streaming.set()
+        elif kind == 'unsubscribe':
+            streaming.clear()
+    
+    async def events_handler(self, request):
+        """
+        Server-Sent Events stream for networks that block WebSockets.
+        Sends JSON frames, or the delta stream with ?format=delta.
+        """
+        retry_after = self.admission.admit()
+        if retry_after is not None:
+            return self._busy_response(retry_after)
+        try:
+            return await self._serve_events(request)
+        finally:
+            self.admission.release()
+    
+    async def _serve_events(self, request):
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            **CORS_HEADERS
+        })
+        await response.prepare(request)
+        
+        protocol = DELTA_PROTOCOL if request.query.get('format') == 'delta' else None
+        subscription = self._subscribe(request, protocol)
+        self.clients.add(response)
+        
+        async def send(message):
+            await response.write(f"data: {message}\n\n".encode())
+        
+        try:
+            while True:
+                await subscription.send_next(send)
+        except SlowConsumerError as e:
+            logger.warning(f"Disconnecting slow SSE client: {e}")
+        except ConnectionResetError:
+            pass
+        finally:
+            self.clients.discard(response)
+            self.hub.unsubscribe(subscription)
+        
+        return response
+    
+    async def poll_handler(self, request):
+        """
+        Long-poll fallback.
+        Returns the first frame whose sequence number differs from ?since=,
+        waiting up to poll_timeout seconds (204 if nothing arrived).
+        """
+        retry_after = self.admission.admit()
+        if retry_after is not None:
+            return self._busy_response(retry_after)
+        try:
+            return await self._serve_poll(request)
+        finally:
+            self.admission.release()
+    
+    async def _serve_poll(self, request):
+        try:
+            since = int(request.query.get('since', 0))
+        except ValueError:
+            since = 0
+        
+        subscription = self.hub.subscribe()
+        try:
+            frame = await asyncio.wait_for(
+                self._frame_after(subscription, since), timeout=self.poll_timeout
+            )
+        except asyncio.TimeoutError:
+            return web.Response(status=204, headers=CORS_HEADERS)
+        finally:
+            self.hub.unsubscribe(subscription)
+        
+        # Reuse the frame's cached JSON encoding
+        body = f'{{"seq":{frame.seq},"timestamp":{frame.timestamp},"pose":{frame.encode()}}}'
+        return web.Response(
+            text=body, content_type='application/json',
+            headers={'Cache-Control': 'no-store', **CORS_HEADERS}
+        )
+    
+    async def _frame_after(self, subscription, since):
+        # A sequence number ahead of ours (server restarted) also counts as stale
+        while True:
+            frame = await subscription.get()
+            if frame.seq != since:
+                return frame
+    
+    async def ingest_handler(self, request):
+        """
+        Frame upload endpoint for deployments without a camera.
+        The browser sends binary messages (JPEG, or raw grayscale with a
+        <uint16 width, uint16 height> header); each processed frame is answered
+        with the avatar movements on the same socket.
+        """
+        retry_after = self.admission.admit()
+        if retry_after is not None:
+            return await self._refuse_websocket(request, retry_after)
+        try:
+            return await self._serve_ingest(request)
+        finally:
+            self.admission.release()
+    
+    async def _serve_ingest(self, request):
+        ws = web.WebSocketResponse(protocols=SUBPROTOCOLS, max_msg_size=MAX_MESSAGE_BYTES)
+        await ws.prepare(request)
+        protocol = ws.ws_protocol
+        send = ws.send_bytes if is_binary(protocol) else ws.send_str
+        
+        # Uploads are limited per client with ?fps=, capped by TRACKING_INGEST_FPS
+        max_fps = parse_rate(request.query.get('fps'), self.ingest_fps, self.ingest_fps)
+        session = FrameIngestSession(send, protocol, max_fps, self.delta_resolution, self.detection)
+        session.set_rate_cap(self.admission.rate_cap)
+        self.ingest_sessions.add(session)
+        self.clients.add(ws)
+        logger.info(f"New ingest client connected. Total clients: {len(self.clients)}")
         
         try:
             async for msg in ws:
-                if msg.type == WSMsgType.TEXT:
+                if msg.type == WSMsgType.BINARY:
+                    session.submit(msg.data)
+                elif msg.type == WSMsgType.TEXT:
                     if msg.data == 'close':
                         await ws.close()
                 elif msg.type == WSMsgType.ERROR:
                     logger.error(f'WebSocket error: {ws.exception()}')
-                
-                # Get face position
-                face_data = tracker.get_face_position()
-                
-                # Calculate avatar movements
-                movements = controller.calculate_movements(face_data)
-                
-                # Send to client
-                await ws.send_str(json.dumps(movements))
-                
-                # Control frame rate (30 FPS)
-                await asyncio.sleep(1/30)
-                
-        except Exception as e:
-            logger.error(f"Error: {e}")
         finally:
+            await session.close()
+            self.ingest_sessions.discard(session)
             self.clients.discard(ws)
-            tracker.release()
+            logger.info(f"Ingest client disconnected: {session.stats()}")
         
         return ws
     
@@ -76,11 +414,22 @@ class TrackingServer:
         logger.info(f"Starting tracking server on {self.host}:{self.port}")
         logger.info(f"Health check: http://{self.host}:{self.port}/health")
         logger.info(f"WebSocket: ws://{self.host}:{self.port}/ws")
+        logger.info(f"Server-Sent Events: http://{self.host}:{self.port}/events")
+        logger.info(f"Long-poll: http://{self.host}:{self.port}/poll?since=<seq>")
+        logger.info(f"Frame upload: ws://{self.host}:{self.port}/ingest")
+        logger.info(f"Metrics: http://{self.host}:{self.port}/metrics")
+        
+        # Load the classifier and probe the camera before the first client connects;
+        # workers reading a pose bus never open the camera themselves
+        camera_index = None if self.bus_name else 0
+        await asyncio.get_running_loop().run_in_executor(None, warm_up, camera_index)
         
         runner = web.AppRunner(self.app)
         await runner.setup()
-        site = web.TCPSite(runner, self.host, self.port)
+        site = web.TCPSite(runner, self.host, self.port, reuse_port=self.reuse_port or None)
         await site.start()
+        self.loop_lag.start()
+        self.admission.start()
         
         # Keep running
         try:
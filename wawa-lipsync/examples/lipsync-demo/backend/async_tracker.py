@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, Optional
+from simple_face_tracker import SimpleFaceTracker
+from frame_scheduler import FrameScheduler
+
+logger = logging.getLogger(__name__)
+
+class AsyncFaceTracker:
+    """
+    Asyncio front-end for the blocking face trackers.
+    Capture and detection run on a dedicated worker thread (OpenCV releases the GIL),
+    and results are handed back through a single-slot asyncio queue holding the newest one.
+    """
+
+    def __init__(self, tracker_factory: Callable = SimpleFaceTracker, fps: float = 30,
+                 scheduler: Optional[FrameScheduler] = None):
+        self.tracker_factory = tracker_factory
+        self.scheduler = scheduler or FrameScheduler(fps)
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._running = threading.Event()
+
+    def start(self):
+        """Start the worker thread; must be called from the event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=1)
+        self._running.set()
+        self._thread = threading.Thread(target=self._worker, name='face-tracker', daemon=True)
+        self._thread.start()
+
+    async def get_face_position(self) -> Dict:
+        """Wait for the next tracking result without blocking the event loop."""
+        face_data, error = await self._queue.get()
+        if error is not None:
+            raise error
+        return face_data
+
+    async def release(self):
+        """Stop the worker thread and release the camera."""
+        self._running.clear()
+        if self._thread is not None:
+            await self._loop.run_in_executor(None, self._thread.join)
+            self._thread = None
+
+    def _deliver(self, face_data, error=None):
+        """Runs on the event loop: keep only the newest result."""
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait((face_data, error))
+
+    def _post(self, face_data, error=None):
+        """Hand a result to the event loop from the worker thread."""
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, face_data, error)
+        except RuntimeError:
+            # Event loop already closed
+            self._running.clear()
+
+    def _worker(self):
+        """Capture -> detect loop; the tracker lives entirely on this thread."""
+        tracker = None
+
+        try:
+            # Opening the camera can take a while, so do it here too
+            tracker = self.tracker_factory()
+            self.scheduler.reset()
+            while self._running.is_set():
+                face_data = tracker.get_face_position()
+                self._post(face_data)
+
+                # Pace against absolute deadlines
+                self.scheduler.sleep()
+        except Exception as e:
+            logger.error(f"Tracker worker failed: {e}")
+            self._post(None, e)
+        finally:
+            if tracker is not None:
+                tracker.release()
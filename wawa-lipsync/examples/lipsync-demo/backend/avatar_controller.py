@@ -1,6 +1,7 @@
 import numpy as np
 import time
-from typing import Dict
+from typing import Dict, Optional, Tuple
+from wire_format import ANIMATION_KEY
 
 class AvatarController:
     """Converts face positions to avatar movement commands."""
@@ -18,13 +19,21 @@ class AvatarController:
             'eye': {'x': 20, 'y': 15}
         }
         
-        # Smoothing factors (0-1, higher = smoother)
+        # Smoothing factors (0-1, fraction of the way to the target covered per frame)
         self.smoothing = {
             'body': 0.08,
             'head': 0.12,
             'eye': 0.25
         }
         
+        # Positions from the predictive filter are already smooth: head and eyes only
+        # take the edge off (about one frame of lag), the body keeps its deliberately slow turn
+        self.filtered_smoothing = {
+            'body': 0.08,
+            'head': 0.5,
+            'eye': 0.6
+        }
+        
         # Idle animation parameters
         self.idle_time_start = time.time()
         self.last_detection_time = time.time()
@@ -54,12 +63,11 @@ class AvatarController:
         movements = self._calculate_target_rotations(norm_x, norm_y, norm_z)
         
         # Apply smoothing
-        self._apply_smoothing(movements)
+        smoothing = self.filtered_smoothing if face_data.get('filtered') else self.smoothing
+        self._apply_smoothing(movements, smoothing)
         
         # Add micro-movements for realism
-        self._add_micro_movements(current_time)
-        
-        return self._format_output()
+        return self._format_output(self._micro_movements(current_time))
     
     def _calculate_target_rotations(self, x: float, y: float, z: float) -> Dict:
         """Calculate target rotations based on normalized face position."""
@@ -86,45 +94,47 @@ class AvatarController:
         
         return targets
     
-    def _apply_smoothing(self, targets: Dict):
+    def _apply_smoothing(self, targets: Dict, smoothing: Dict):
         """Apply smoothing to prevent jittery movements."""
         # Body smoothing
         if 'body_y' in targets:
             self.body_rotation['y'] += (
                 targets['body_y'] - self.body_rotation['y']
-            ) * self.smoothing['body']
+            ) * smoothing['body']
         
         # Head smoothing
         if 'head_x' in targets:
             self.head_rotation['x'] += (
                 targets['head_x'] - self.head_rotation['x']
-            ) * self.smoothing['head']
+            ) * smoothing['head']
         if 'head_y' in targets:
             self.head_rotation['y'] += (
                 targets['head_y'] - self.head_rotation['y']
-            ) * self.smoothing['head']
+            ) * smoothing['head']
         
         # Eye smoothing
         if 'eye_x' in targets:
             self.eye_rotation['x'] += (
                 targets['eye_x'] - self.eye_rotation['x']
-            ) * self.smoothing['eye']
+            ) * smoothing['eye']
         if 'eye_y' in targets:
             self.eye_rotation['y'] += (
                 targets['eye_y'] - self.eye_rotation['y']
-            ) * self.smoothing['eye']
+            ) * smoothing['eye']
     
-    def _add_micro_movements(self, current_time: float):
-        """Add subtle natural movements."""
+    def _micro_movements(self, current_time: float) -> Tuple[float, float, float]:
+        """
+        Subtle natural movements in degrees: (head breathing, eye drift x, eye drift y).
+        They are layered on the smoothed pose rather than fed through the smoothing,
+        so their amplitude does not depend on it and encoders can tell them apart.
+        """
         # Subtle breathing motion
-        breathing = np.sin(current_time * 0.3) * 0.5
-        self.head_rotation['y'] += breathing
+        breathing = np.sin(current_time * 0.3) * 4.2
         
         # Micro eye movements
-        eye_drift_x = np.sin(current_time * 1.7) * 0.3
-        eye_drift_y = np.cos(current_time * 2.1) * 0.2
-        self.eye_rotation['x'] += eye_drift_x
-        self.eye_rotation['y'] += eye_drift_y
+        eye_drift_x = np.sin(current_time * 1.7) * 1.2
+        eye_drift_y = np.cos(current_time * 2.1) * 0.8
+        return breathing, eye_drift_x, eye_drift_y
     
     def _get_idle_animation(self, current_time: float) -> Dict:
         """Generate idle animation when no face detected."""
@@ -155,18 +165,24 @@ class AvatarController:
         
         return self._format_output()
     
-    def _format_output(self) -> Dict:
+    def _format_output(self, micro: Optional[Tuple[float, float, float]] = None) -> Dict:
         """Format the output for sending to frontend."""
-        return {
+        breathing, drift_x, drift_y = micro or (0.0, 0.0, 0.0)
+        head_y = self.head_rotation['y'] + breathing
+        movements = {
             'body': {'y': self.body_rotation['y']},
             'head': {
                 'x': self.head_rotation['x'] - self.body_rotation['y'] * 0.3,
-                'y': self.head_rotation['y']
+                'y': head_y
             },
             'eyes': {
-                'x': self.eye_rotation['x'] - self.head_rotation['x'] * 0.5,
-                'y': self.eye_rotation['y'] - self.head_rotation['y'] * 0.5
+                'x': self.eye_rotation['x'] + drift_x - self.head_rotation['x'] * 0.5,
+                'y': self.eye_rotation['y'] + drift_y - head_y * 0.5
             },
             'blink': np.random.random() < 0.008
         }
+        if micro is not None:
+            # What the micro-movements added to each wire angle (body.y, head.x, head.y, eyes.x, eyes.y)
+            movements[ANIMATION_KEY] = (0.0, 0.0, breathing, drift_x, drift_y - breathing * 0.5)
+        return movements
 
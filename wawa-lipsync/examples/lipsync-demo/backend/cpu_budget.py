@@ -0,0 +1,102 @@
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+import cv2
+
+logger = logging.getLogger(__name__)
+
+def _usable_cores() -> List[int]:
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        # Not available on macOS or Windows
+        return list(range(os.cpu_count() or 1))
+
+class CpuBudget:
+    """
+    This process's share of the deployment's CPU budget.
+
+    TRACKING_CPU_BUDGET cores (default: every core the process may use) are
+    split evenly across the processes of a deployment (the pose publisher and
+    server workers in multi-worker mode). Within a process the share is divided
+    among the pipelines detecting at the same time: OpenCV's own thread pool
+    (cv2.setNumThreads) gets share / active pipelines threads, so one camera
+    can use every core while many uploading clients run single-threaded
+    detections side by side instead of oversubscribing the host.
+
+    With TRACKING_CPU_PIN=1 the process is pinned to its own slice of cores,
+    so packed instances do not migrate across each other's caches.
+    """
+
+    _shared = None
+    _lock = threading.Lock()
+
+    def __init__(self, cores: Optional[float] = None, processes: int = 1, process_index: int = 0,
+                 pin: bool = False):
+        usable = _usable_cores()
+        self.budget = min(float(cores), len(usable)) if cores else float(len(usable))
+        self.processes = processes
+        self.process_index = process_index
+        self.share = max(1, int(self.budget / processes))
+        self.pinned: List[int] = []
+        if pin and hasattr(os, 'sched_setaffinity'):
+            # Consecutive slices per process, wrapping when processes outnumber the cores
+            start = process_index * self.share
+            self.pinned = sorted({usable[(start + i) % len(usable)] for i in range(self.share)})
+            os.sched_setaffinity(0, self.pinned)
+        self.pipelines = 0
+        self.opencv_threads = 0
+        self._apply()
+
+    @classmethod
+    def shared(cls) -> 'CpuBudget':
+        """The budget of this process; configured from the environment on first use."""
+        with cls._lock:
+            if cls._shared is None:
+                cls._shared = cls.from_env()
+            return cls._shared
+
+    @classmethod
+    def configure(cls, processes: int = 1, process_index: int = 0) -> 'CpuBudget':
+        """Set this process's place in a multi-process deployment; call before any threads start."""
+        with cls._lock:
+            cls._shared = cls.from_env(processes, process_index)
+            return cls._shared
+
+    @classmethod
+    def from_env(cls, processes: int = 1, process_index: int = 0) -> 'CpuBudget':
+        return cls(
+            cores=float(os.environ.get('TRACKING_CPU_BUDGET', 0)) or None,
+            processes=processes,
+            process_index=process_index,
+            pin=os.environ.get('TRACKING_CPU_PIN', '0') == '1'
+        )
+
+    def add_pipeline(self):
+        """A capture or upload pipeline started detecting."""
+        with self._lock:
+            self.pipelines += 1
+            self._apply()
+
+    def remove_pipeline(self):
+        with self._lock:
+            self.pipelines = max(0, self.pipelines - 1)
+            self._apply()
+
+    def _apply(self):
+        threads = max(1, self.share // max(1, self.pipelines))
+        if threads != self.opencv_threads:
+            self.opencv_threads = threads
+            cv2.setNumThreads(threads)
+
+    def stats(self) -> Dict:
+        return {
+            'budget_cores': self.budget,
+            'processes': self.processes,
+            'process_index': self.process_index,
+            'process_cores': self.share,
+            'pinned_cores': self.pinned,
+            'pipelines': self.pipelines,
+            'opencv_threads': self.opencv_threads
+        }
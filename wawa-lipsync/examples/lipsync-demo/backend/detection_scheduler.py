@@ -0,0 +1,114 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional
+from cpu_budget import CpuBudget
+
+class FrameExpiredError(Exception):
+    """The frame waited past its deadline and was dropped instead of processed late."""
+
+class FrameReplacedError(Exception):
+    """A newer frame from the same source took this frame's place in the queue."""
+
+class DetectionScheduler:
+    """
+    Spreads detection work from many sources (uploading clients, cameras) over a
+    sized thread pool (one worker per core of the process's CPU budget by
+    default). OpenCV releases the GIL while detecting, so throughput scales with cores.
+
+    Each source has at most one pending frame (newer frames replace older ones).
+    Free workers take the least recently served source first, which is plain
+    round-robin while everyone keeps up and lets sources that lost frames to the
+    deadline catch up under overload, so a fast uploader cannot starve the others.
+    A frame still waiting when its deadline passes is dropped.
+    """
+
+    _shared = None
+
+    def __init__(self, workers: Optional[int] = None, deadline: float = 0.1):
+        self.workers = workers or CpuBudget.shared().share
+        self.deadline = deadline
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='detect')
+        self._pending = {}
+        self._served = {}
+        self._in_flight = 0
+        self.processed = 0
+        self.expired = 0
+        self.replaced = 0
+
+    @classmethod
+    def shared(cls) -> 'DetectionScheduler':
+        """Return the scheduler shared by every source in this process."""
+        if cls._shared is None:
+            cls._shared = cls(
+                workers=int(os.environ.get('TRACKING_DETECT_WORKERS', 0)) or None,
+                deadline=float(os.environ.get('TRACKING_DETECT_DEADLINE_MS', 100)) / 1000
+            )
+        return cls._shared
+
+    async def detect(self, source: Hashable, job: Callable, deadline: Optional[float] = None):
+        """
+        Queue `job` (a blocking callable) for `source` and return its result.
+        Raises FrameExpiredError or FrameReplacedError if the frame was dropped.
+        """
+        future = asyncio.get_running_loop().create_future()
+        expires = time.monotonic() + (deadline if deadline is not None else self.deadline)
+
+        previous = self._pending.get(source)
+        if previous is not None:
+            self.replaced += 1
+            previous[2].set_exception(FrameReplacedError())
+        self._pending[source] = (job, expires, future)
+
+        self._dispatch()
+        return await future
+
+    def _dispatch(self):
+        """Drop expired frames, then hand pending frames to free workers."""
+        now = time.monotonic()
+        for source, (job, expires, future) in list(self._pending.items()):
+            if future.done():
+                # Caller went away
+                del self._pending[source]
+            elif now > expires:
+                del self._pending[source]
+                self.expired += 1
+                future.set_exception(FrameExpiredError())
+
+        while self._pending and self._in_flight < self.workers:
+            source = min(self._pending, key=lambda s: self._served.get(s, 0.0))
+            job, expires, future = self._pending.pop(source)
+            self._served[source] = now
+            self._in_flight += 1
+            work = asyncio.get_running_loop().run_in_executor(self.executor, job)
+            work.add_done_callback(lambda done, future=future: self._finished(done, future))
+
+    def _finished(self, done, future):
+        self._in_flight -= 1
+        self.processed += 1
+        if not future.done():
+            if done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result())
+        self._dispatch()
+
+    def forget(self, source: Hashable):
+        """Drop bookkeeping for a source that went away."""
+        self._served.pop(source, None)
+        pending = self._pending.pop(source, None)
+        if pending is not None and not pending[2].done():
+            pending[2].cancel()
+
+    def stats(self) -> Dict:
+        """Pool occupancy and drop counters."""
+        return {
+            'workers': self.workers,
+            'in_flight': self._in_flight,
+            'pending': len(self._pending),
+            'sources': len(self._served),
+            'processed': self.processed,
+            'expired': self.expired,
+            'replaced': self.replaced
+        }
@@ -0,0 +1,303 @@
+import importlib.util
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from synthetic_face import make_face_frames
+
+logger = logging.getLogger(__name__)
+
+Box = Tuple[int, int, int, int]
+
+CASCADE_PATH = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+# Optional model files (not shipped with OpenCV's wheels) are looked up here
+MODEL_DIR = os.environ.get('TRACKING_MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+LBP_CASCADE = 'lbpcascade_frontalface_improved.xml'
+DNN_CONFIG = 'deploy.prototxt'
+DNN_WEIGHTS = 'res10_300x300_ssd_iter_140000.caffemodel'
+
+class ModelPool:
+    """
+    Process-wide pool of loaded models.
+    Loading costs tens of milliseconds and a model instance must not be used by
+    two threads at once, so idle instances are kept here and checked out per
+    detection. New tracker threads and reconnects reuse them.
+    """
+
+    def __init__(self, load: Callable):
+        self.load = load
+        self._idle = queue.SimpleQueue()
+        self.loaded = 0
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            self.loaded += 1
+            return self.load()
+
+    def release(self, model):
+        self._idle.put(model)
+
+def _largest(faces: List[Box]) -> Optional[Box]:
+    if not faces:
+        return None
+    return max(faces, key=lambda f: f[2] * f[3])
+
+DETECTORS: Dict[str, type] = {}
+
+def register(name: str):
+    """Class decorator adding a backend to the registry under `name`."""
+    def decorator(cls):
+        cls.name = name
+        DETECTORS[name] = cls
+        return cls
+    return decorator
+
+class FaceDetector:
+    """
+    Common interface of the detector backends: find the largest face in a
+    grayscale image. ROI search, downscaling and tracking are layered on top
+    by SimpleFaceTracker, so backends only deal with one image at a time.
+    """
+
+    name = None
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether the backend's dependencies and model files are present."""
+        return True
+
+    def detect_all(self, gray: np.ndarray, min_size: Tuple[int, int] = (30, 30),
+                   max_size: Tuple[int, int] = (0, 0), scale_factor: float = 1.1,
+                   min_neighbors: int = 5) -> List[Box]:
+        """
+        Every face as (x, y, w, h) in image pixels. scale_factor and
+        min_neighbors tune the cascades; other backends ignore them.
+        """
+        raise NotImplementedError
+
+    def detect(self, gray: np.ndarray, min_size: Tuple[int, int] = (30, 30),
+               max_size: Tuple[int, int] = (0, 0), scale_factor: float = 1.1,
+               min_neighbors: int = 5) -> Optional[Box]:
+        """Largest face as (x, y, w, h) in image pixels, or None."""
+        return _largest(self.detect_all(gray, min_size, max_size, scale_factor, min_neighbors))
+
+    def warm_up(self):
+        """Load the model and run one detection so the first real frame is fast."""
+        self.detect(np.zeros((120, 160), dtype=np.uint8))
+
+@register('haar')
+class HaarDetector(FaceDetector):
+    """OpenCV's Haar frontal-face cascade (always available)."""
+
+    path = CASCADE_PATH
+    _pools: Dict[str, ModelPool] = {}
+
+    def __init__(self):
+        pool = self._pools.get(self.path)
+        if pool is None:
+            pool = self._pools[self.path] = ModelPool(lambda: cv2.CascadeClassifier(self.path))
+        self.cascades = pool
+
+    def detect_all(self, gray, min_size=(30, 30), max_size=(0, 0), scale_factor=1.1, min_neighbors=5):
+        cascade = self.cascades.acquire()
+        try:
+            faces = cascade.detectMultiScale(
+                gray,
+                scaleFactor=scale_factor,
+                minNeighbors=min_neighbors,
+                minSize=min_size,
+                maxSize=max_size
+            )
+        finally:
+            self.cascades.release(cascade)
+        return [(int(x), int(y), int(w), int(h)) for x, y, w, h in faces]
+
+@register('lbp')
+class LbpDetector(HaarDetector):
+    """LBP cascade: faster and less accurate than Haar; needs the XML in MODEL_DIR."""
+
+    path = os.path.join(MODEL_DIR, LBP_CASCADE)
+
+    @classmethod
+    def available(cls):
+        return os.path.isfile(cls.path)
+
+@register('dnn')
+class DnnDetector(FaceDetector):
+    """OpenCV DNN res10 SSD face detector; needs the Caffe files in MODEL_DIR."""
+
+    config = os.path.join(MODEL_DIR, DNN_CONFIG)
+    weights = os.path.join(MODEL_DIR, DNN_WEIGHTS)
+    _pool = None
+
+    def __init__(self, min_confidence: float = 0.5):
+        self.min_confidence = min_confidence
+        if DnnDetector._pool is None:
+            DnnDetector._pool = ModelPool(lambda: cv2.dnn.readNetFromCaffe(self.config, self.weights))
+        self.nets = DnnDetector._pool
+
+    @classmethod
+    def available(cls):
+        return os.path.isfile(cls.config) and os.path.isfile(cls.weights)
+
+    def detect_all(self, gray, min_size=(30, 30), max_size=(0, 0), scale_factor=1.1, min_neighbors=5):
+        height, width = gray.shape[:2]
+        blob = cv2.dnn.blobFromImage(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR), 1.0, (300, 300), (104, 177, 123))
+        net = self.nets.acquire()
+        try:
+            net.setInput(blob)
+            detections = net.forward()[0, 0]
+        finally:
+            self.nets.release(net)
+
+        faces = []
+        for confidence, x0, y0, x1, y1 in detections[:, 2:7]:
+            if confidence < self.min_confidence:
+                continue
+            x, y = max(0, int(x0 * width)), max(0, int(y0 * height))
+            w, h = int(x1 * width) - x, int(y1 * height) - y
+            if w < min_size[0] or h < min_size[1]:
+                continue
+            if max_size[0] and (w > max_size[0] or h > max_size[1]):
+                continue
+            faces.append((x, y, w, h))
+        return faces
+
+@register('mediapipe')
+class MediaPipeDetector(FaceDetector):
+    """MediaPipe face detection, when the optional package is installed."""
+
+    _pool = None
+
+    def __init__(self, min_confidence: float = 0.5):
+        if MediaPipeDetector._pool is None:
+            # Heavy import, only paid when this backend is used
+            import mediapipe as mp
+            MediaPipeDetector._pool = ModelPool(lambda: mp.solutions.face_detection.FaceDetection(
+                model_selection=1, min_detection_confidence=min_confidence
+            ))
+        self.detectors = MediaPipeDetector._pool
+
+    @classmethod
+    def available(cls):
+        return importlib.util.find_spec('mediapipe') is not None
+
+    def detect_all(self, gray, min_size=(30, 30), max_size=(0, 0), scale_factor=1.1, min_neighbors=5):
+        height, width = gray.shape[:2]
+        detector = self.detectors.acquire()
+        try:
+            results = detector.process(cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB))
+        finally:
+            self.detectors.release(detector)
+
+        faces = []
+        for detection in results.detections or ():
+            bbox = detection.location_data.relative_bounding_box
+            x, y = max(0, int(bbox.xmin * width)), max(0, int(bbox.ymin * height))
+            w, h = int(bbox.width * width), int(bbox.height * height)
+            if w < min_size[0] or h < min_size[1]:
+                continue
+            if max_size[0] and (w > max_size[0] or h > max_size[1]):
+                continue
+            faces.append((x, y, w, h))
+        return faces
+
+def available_detectors() -> List[str]:
+    return [name for name, cls in DETECTORS.items() if cls.available()]
+
+def create_detector(name: str) -> FaceDetector:
+    """Instantiate a registered backend by name."""
+    try:
+        cls = DETECTORS[name]
+    except KeyError:
+        raise ValueError(f"unknown detector '{name}', expected one of {', '.join(DETECTORS)}")
+    if not cls.available():
+        raise ValueError(f"detector '{name}' is not available (missing package or model file)")
+    return cls()
+
+def _hit(found: Optional[Box], truth: Box) -> bool:
+    # The detected box centre must fall inside the drawn face
+    if found is None:
+        return False
+    cx, cy = found[0] + found[2] / 2, found[1] + found[3] / 2
+    x, y, w, h = truth
+    return x <= cx <= x + w and y <= cy <= y + h
+
+def benchmark(names: Optional[List[str]] = None, frame_size: Tuple[int, int] = (640, 480),
+              frames: int = 6) -> Dict[str, Dict]:
+    """
+    Time each available backend on synthetic face frames.
+    Returns {name: {'latency_ms': median, 'recall': fraction of faces found}}.
+    """
+    samples = make_face_frames(frames, frame_size)
+    results = {}
+    for name in names or available_detectors():
+        try:
+            detector = create_detector(name)
+            detector.warm_up()
+        except Exception as e:
+            logger.warning(f"Detector '{name}' failed to load: {e}")
+            continue
+
+        timings, hits = [], 0
+        for frame, truth in samples:
+            start = time.perf_counter()
+            found = detector.detect(frame)
+            timings.append(time.perf_counter() - start)
+            hits += _hit(found, truth)
+        results[name] = {
+            'latency_ms': round(float(np.median(timings)) * 1000, 2),
+            'recall': hits / len(samples)
+        }
+    return results
+
+def choose_detector(budget_ms: float, min_recall: float, frame_size: Tuple[int, int] = (640, 480),
+                    names: Optional[List[str]] = None) -> Tuple[str, Dict[str, Dict]]:
+    """
+    Pick the fastest backend with at least `min_recall` within `budget_ms`.
+    If none fits the budget, the fastest accurate one wins; if none is accurate, Haar.
+    """
+    names = names or available_detectors()
+    if len(names) == 1:
+        # Nothing to choose between
+        return names[0], {}
+    results = benchmark(names, frame_size)
+    accurate = sorted((r['latency_ms'], name) for name, r in results.items() if r['recall'] >= min_recall)
+    within_budget = [entry for entry in accurate if entry[0] <= budget_ms]
+    if within_budget:
+        return within_budget[0][1], results
+    if accurate:
+        return accurate[0][1], results
+    return 'haar', results
+
+_selected: Optional[FaceDetector] = None
+_selected_lock = threading.Lock()
+benchmark_results: Dict[str, Dict] = {}
+
+def default_detector(frame_size: Tuple[int, int] = (640, 480)) -> FaceDetector:
+    """
+    The process-wide backend: TRACKING_DETECTOR names one (haar, lbp, dnn,
+    mediapipe), or 'auto' (the default) benchmarks the available ones once.
+    """
+    global _selected
+    with _selected_lock:
+        if _selected is None:
+            name = os.environ.get('TRACKING_DETECTOR', 'auto')
+            if name == 'auto':
+                name, results = choose_detector(
+                    budget_ms=float(os.environ.get('TRACKING_DETECTOR_BUDGET_MS', 50)),
+                    min_recall=float(os.environ.get('TRACKING_DETECTOR_MIN_RECALL', 0.8)),
+                    frame_size=frame_size
+                )
+                benchmark_results.update(results)
+                if results:
+                    logger.info(f"Detector benchmark: {results}; using '{name}'")
+            _selected = create_detector(name)
+        return _selected
@@ -1,12 +1,18 @@
 import cv2
-import mediapipe as mp
 import numpy as np
-from typing import Optional, Dict
+import time
+from typing import Optional, Dict, Tuple
+from frame_sources import FrameSource, open_source
+from pose_filter import DISPLAY_DELAY, OneEuroFilter, filter_from_env
 
 class FaceTracker:
     """Handles webcam capture and face detection using MediaPipe."""
     
-    def __init__(self, camera_index: int = 0):
+    def __init__(self, camera_index: int = 0, capture_size: Tuple[int, int] = (640, 480),
+                 position_filter: Optional[OneEuroFilter] = None, source: Optional[FrameSource] = None):
+        # MediaPipe is heavy and optional, so only import it when this tracker is used
+        import mediapipe as mp
+        
         # Initialize MediaPipe Face Detection
         self.mp_face_detection = mp.solutions.face_detection
         self.face_detection = self.mp_face_detection.FaceDetection(
@@ -14,13 +20,12 @@ class FaceTracker:
             min_detection_confidence=0.5
         )
         
-        # Initialize camera
-        self.cap = cv2.VideoCapture(camera_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        # Frame source: the one given, else TRACKING_SOURCE (the camera by default)
+        self.source = source or open_source(camera_index, capture_size)
         
-        # Smoothing parameters
+        # Smoothing parameters; a predictive filter (TRACKING_FILTER) replaces the fixed factor
         self.smooth_factor = 0.15
+        self.position_filter = position_filter or filter_from_env()
         self.current_position = {'x': 0.5, 'y': 0.5, 'z': 0.5}
         self.detection_confidence = 0.0
     
@@ -29,7 +34,10 @@ class FaceTracker:
         Capture frame and detect face position.
         Returns normalized coordinates (0-1) or None if no face detected.
         """
-        ret, frame = self.cap.read()
+        if self.source is None:
+            return None
+        ret, frame = self.source.read()
+        captured_at = time.time()
         if not ret:
             return None
         
@@ -50,10 +58,16 @@ class FaceTracker:
             face_size = bbox.width * bbox.height
             center_z = min(1.0, face_size * 4)  # Normalize to 0-1
             
-            # Apply smoothing for stable tracking
-            self.current_position['x'] += (center_x - self.current_position['x']) * self.smooth_factor
-            self.current_position['y'] += (center_y - self.current_position['y']) * self.smooth_factor
-            self.current_position['z'] += (center_z - self.current_position['z']) * self.smooth_factor
+            if self.position_filter is not None:
+                # Filter and extrapolate to when the pose will be displayed
+                lead = time.time() - captured_at + DISPLAY_DELAY
+                x, y, z = np.clip(self.position_filter((center_x, center_y, center_z), captured_at, lead)[0], 0.0, 1.0)
+                self.current_position.update(x=float(x), y=float(y), z=float(z))
+            else:
+                # Apply smoothing for stable tracking
+                self.current_position['x'] += (center_x - self.current_position['x']) * self.smooth_factor
+                self.current_position['y'] += (center_y - self.current_position['y']) * self.smooth_factor
+                self.current_position['z'] += (center_z - self.current_position['z']) * self.smooth_factor
             
             self.detection_confidence = detection.score[0] if detection.score else 0.5
             
@@ -62,13 +76,15 @@ class FaceTracker:
                 'y': self.current_position['y'],
                 'z': self.current_position['z'],
                 'confidence': self.detection_confidence,
-                'detected': True
+                'detected': True,
+                'filtered': self.position_filter is not None
             }
         
         return {'detected': False, 'confidence': 0.0}
     
     def release(self):
         """Clean up resources."""
-        self.cap.release()
+        if self.source is not None:
+            self.source.release()
         cv2.destroyAllWindows()
 
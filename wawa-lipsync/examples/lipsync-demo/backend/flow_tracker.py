@@ -0,0 +1,93 @@
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+# Lucas-Kanade parameters; two pyramid levels cover head motion at webcam rates
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+class FlowTracker:
+    """
+    Follows a face bbox between detections with sparse optical flow.
+    Corners found inside the bbox are tracked with pyramidal Lucas-Kanade,
+    checked forward and backward, and the bbox moves (and scales) with the
+    median of the surviving points. update() returns None once too few points
+    survive, which is the signal to run the detector again.
+    """
+
+    def __init__(self, max_points: int = 40, min_points: int = 8, max_fb_error: float = 1.0):
+        self.max_points = max_points
+        self.min_points = min_points
+        self.max_fb_error = max_fb_error
+        self.points: Optional[np.ndarray] = None
+        self.bbox: Optional[Tuple[float, float, float, float]] = None
+        self.quality = 0.0
+        self._prev: Optional[np.ndarray] = None
+
+    def start(self, gray: np.ndarray, bbox: Tuple[int, int, int, int]) -> bool:
+        """Seed corners inside `bbox` (x, y, w, h); False if the face has too little texture."""
+        x, y, w, h = bbox
+        # Inner part of the box: background corners at the edges would drag it along
+        mx, my = w // 6, h // 6
+        corners = cv2.goodFeaturesToTrack(
+            gray[y + my:y + h - my, x + mx:x + w - mx],
+            maxCorners=self.max_points, qualityLevel=0.01, minDistance=5
+        )
+        if corners is None or len(corners) < self.min_points:
+            self.points = None
+            return False
+
+        corners += np.array([x + mx, y + my], dtype=np.float32)
+        self.points = corners
+        self.bbox = (float(x), float(y), float(w), float(h))
+        self.quality = 1.0
+        self._remember(gray)
+        return True
+
+    def update(self, gray: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """Track into `gray`; returns the new bbox, or None on loss or drift."""
+        if self.points is None or self._prev.shape != gray.shape:
+            return None
+
+        new, status, _ = cv2.calcOpticalFlowPyrLK(self._prev, gray, self.points, None, **LK_PARAMS)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._prev, new, None, **LK_PARAMS)
+        fb_error = np.abs(back - self.points).reshape(-1, 2).max(axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+
+        count = int(good.sum())
+        self.quality = count / len(self.points)
+        if count < self.min_points:
+            self.points = None
+            return None
+
+        old_pts = self.points.reshape(-1, 2)[good]
+        new_pts = new.reshape(-1, 2)[good]
+        dx, dy = np.median(new_pts - old_pts, axis=0)
+
+        # Scale from the spread of the points around their median
+        old_spread = np.median(np.linalg.norm(old_pts - np.median(old_pts, axis=0), axis=1))
+        new_spread = np.median(np.linalg.norm(new_pts - np.median(new_pts, axis=0), axis=1))
+        scale = new_spread / old_spread if old_spread > 0 else 1.0
+
+        x, y, w, h = self.bbox
+        cx, cy = x + w / 2 + dx, y + h / 2 + dy
+        w, h = w * scale, h * scale
+        x, y = cx - w / 2, cy - h / 2
+        if x < 0 or y < 0 or x + w > gray.shape[1] or y + h > gray.shape[0]:
+            # Face is leaving the frame
+            self.points = None
+            return None
+
+        self.bbox = (x, y, w, h)
+        self.points = new_pts.reshape(-1, 1, 2)
+        self._remember(gray)
+        return int(x), int(y), int(w), int(h)
+
+    def reset(self):
+        self.points = None
+
+    def _remember(self, gray: np.ndarray):
+        # Copy into a reused buffer: the caller may recycle its frame
+        if self._prev is None or self._prev.shape != gray.shape:
+            self._prev = np.empty_like(gray)
+        np.copyto(self._prev, gray)
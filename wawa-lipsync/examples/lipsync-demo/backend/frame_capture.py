@@ -0,0 +1,106 @@
+import threading
+import time
+from typing import Optional, Tuple
+import cv2
+import numpy as np
+import metrics
+
+class LatestFrameCapture:
+    """
+    Grabs camera frames continuously on its own thread and keeps only the newest.
+
+    Frames are retrieved straight into a preallocated triple buffer (cap.retrieve(image=...)):
+    the capture thread fills the back slot and swaps it with the ready slot, and
+    read() swaps the ready slot with the front slot it hands out. No frame is
+    copied or allocated per frame, and the consumer always gets the freshest one
+    instead of whatever is queued in the driver.
+
+    Sources that are not live (files, generated frames) are not dropped: the
+    capture thread waits until the previous frame was taken before handing
+    over the next one.
+    """
+
+    def __init__(self, cap: cv2.VideoCapture):
+        self.cap = cap
+        self.live = getattr(cap, 'live', True)
+        self.frames = 0
+        self.failures = 0
+        self._slots = None
+        self._stamps = [0.0, 0.0, 0.0]
+        # Slot indices: written by the capture thread / newest complete / held by the reader
+        self._back, self._ready, self._front = 0, 1, 2
+        self._fresh = False
+        self._cond = threading.Condition()
+        self._running = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name='frame-capture', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def read(self, timeout: float = 1.0) -> Tuple[Optional[np.ndarray], float]:
+        """
+        Wait for a frame newer than the last one returned.
+        Returns (frame, capture timestamp), or (None, 0.0) on timeout. The frame
+        is only valid until the next read().
+        """
+        with self._cond:
+            if not self._fresh and not self._cond.wait_for(lambda: self._fresh, timeout):
+                return None, 0.0
+            self._ready, self._front = self._front, self._ready
+            self._fresh = False
+            self._cond.notify_all()
+            return self._slots[self._front], self._stamps[self._front]
+
+    def _retrieve(self) -> bool:
+        """Retrieve the grabbed frame into the back slot."""
+        if self._slots is None:
+            ok, frame = self.cap.retrieve()
+            if ok:
+                # Size the ring from the first frame
+                self._slots = [frame, np.empty_like(frame), np.empty_like(frame)]
+                self._back = 0
+            return ok
+        buffer = self._slots[self._back]
+        ok, frame = self.cap.retrieve(image=buffer)
+        if ok and frame is not buffer:
+            # Resolution changed: adopt the new buffer and resize the others
+            self._slots = [np.empty_like(frame) for _ in range(3)]
+            self._slots[self._back] = frame
+        return ok
+
+    def _run(self):
+        while self._running.is_set():
+            # Waiting for the next frame (device or source pacing) is not capture cost:
+            # only retrieving it (decode, conversion, copy into the slot) is timed
+            ok = self.cap.grab()
+            captured_at = time.time()
+            if ok:
+                start = time.perf_counter()
+                ok = self._retrieve()
+                metrics.observe('capture', time.perf_counter() - start)
+
+            if not ok:
+                self.failures += 1
+                # Camera unplugged or busy: back off instead of spinning
+                time.sleep(0.05)
+                continue
+
+            self.frames += 1
+            with self._cond:
+                if not self.live:
+                    while self._fresh and self._running.is_set():
+                        self._cond.wait(0.1)
+                    # A recorded frame counts as captured when it is handed over
+                    captured_at = time.time()
+                self._stamps[self._back] = captured_at
+                self._back, self._ready = self._ready, self._back
+                self._fresh = True
+                self._cond.notify_all()
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import struct
+import time
+from typing import Callable, Dict, Optional, Tuple
+import cv2
+import numpy as np
+from simple_face_tracker import SimpleFaceTracker
+from avatar_controller import AvatarController
+from detection_scheduler import DetectionScheduler, FrameExpiredError, FrameReplacedError
+from cpu_budget import CpuBudget
+import wire_format
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Raw grayscale upload: little-endian uint16 width, uint16 height, then width*height bytes
+RAW_HEADER = struct.Struct('<HH')
+JPEG_MAGIC = b'\xff\xd8'
+# Big-endian segment length; SOF payload holds precision, then height and width
+JPEG_SEGMENT = struct.Struct('>H')
+JPEG_FRAME_SIZE = struct.Struct('>HH')
+
+# Uploads are expected to be downscaled; anything bigger is refused
+MAX_FRAME_PIXELS = 640 * 480
+
+# Largest upload message accepted: a full raw frame, with room for a high-quality colour JPEG
+MAX_MESSAGE_BYTES = 2 * MAX_FRAME_PIXELS
+
+# Start-of-frame markers carrying the image size (SOF0-SOF15 except DHT, JPG and DAC)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field: TEM and RST0-RST7
+JPEG_STANDALONE_MARKERS = frozenset([0x01, *range(0xD0, 0xD8)])
+
+class FrameDecodeError(ValueError):
+    """Raised for uploads that are neither a valid JPEG nor a raw grayscale frame."""
+
+def jpeg_size(data: bytes) -> Tuple[int, int]:
+    """Read (width, height) from a JPEG's start-of-frame header without decoding it."""
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            raise FrameDecodeError("invalid JPEG")
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte before the marker
+            offset += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS:
+            offset += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image or start of scan before any frame header
+            break
+        length = JPEG_SEGMENT.unpack_from(data, offset + 2)[0]
+        if marker in JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                break
+            height, width = JPEG_FRAME_SIZE.unpack_from(data, offset + 5)
+            return width, height
+        offset += 2 + length
+    raise FrameDecodeError("JPEG has no frame header")
+
+def decode_frame(data: bytes) -> np.ndarray:
+    """Decode an uploaded frame into a grayscale image."""
+    if data[:2] == JPEG_MAGIC:
+        # Refuse oversized images before imdecode allocates them
+        width, height = jpeg_size(data)
+        if width * height == 0 or width * height > MAX_FRAME_PIXELS:
+            raise FrameDecodeError(f"bad frame size: {width}x{height}")
+        gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            raise FrameDecodeError("invalid JPEG")
+        return gray
+
+    if len(data) < RAW_HEADER.size:
+        raise FrameDecodeError("truncated frame header")
+    width, height = RAW_HEADER.unpack_from(data)
+    pixels = width * height
+    if pixels == 0 or pixels > MAX_FRAME_PIXELS:
+        raise FrameDecodeError(f"bad frame size: {width}x{height}")
+    if len(data) != RAW_HEADER.size + pixels:
+        raise FrameDecodeError(f"expected {pixels} pixel bytes, got {len(data) - RAW_HEADER.size}")
+
+    # Zero-copy view over the received message
+    return np.frombuffer(data, dtype=np.uint8, count=pixels, offset=RAW_HEADER.size).reshape(height, width)
+
+class FrameIngestSession:
+    """
+    Per-connection state for clients that upload their own camera frames.
+    At most one frame is in flight; frames arriving while one is being detected,
+    or faster than max_fps, are dropped so latency stays bounded. Detection runs
+    on the shared DetectionScheduler, which also drops frames that waited too long.
+    """
+
+    def __init__(self, send: Callable, protocol: Optional[str] = None, max_fps: float = 30,
+                 resolution: float = 0.1, scheduler: Optional[DetectionScheduler] = None):
+        self.scheduler = scheduler or DetectionScheduler.shared()
+        self.tracker = SimpleFaceTracker(camera_index=None, target_fps=max_fps)
+        CpuBudget.shared().add_pipeline()
+        self.controller = AvatarController()
+        self.send = send
+        self.protocol = protocol
+        self.encoder = wire_format.make_stream_encoder(protocol, resolution)
+        self.max_fps = max_fps
+        self.min_interval = 1.0 / max_fps
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.expired = 0
+        self._seq = 0
+        self._last_accepted = None
+        self._in_flight = None
+
+    def set_rate_cap(self, fps: Optional[float]):
+        """Lower the accepted upload rate below max_fps (None restores it)."""
+        self.min_interval = 1.0 / min(self.max_fps, fps or self.max_fps)
+
+    def submit(self, data: bytes) -> bool:
+        """Start processing a frame unless one is in flight or the client is over its rate."""
+        self.received += 1
+        now = time.monotonic()
+
+        if self._in_flight is not None and not self._in_flight.done():
+            self.dropped += 1
+            return False
+        if self._last_accepted is not None and now - self._last_accepted < self.min_interval:
+            self.dropped += 1
+            return False
+
+        self._last_accepted = now
+        self._in_flight = asyncio.get_running_loop().create_task(self._process(data))
+        return True
+
+    def _detect(self, data: bytes) -> Dict:
+        # Runs on the detection pool: decoding and detection release the GIL
+        return self.tracker.process_frame(decode_frame(data))
+
+    async def _process(self, data: bytes):
+        try:
+            face_data = await self.scheduler.detect(self, lambda: self._detect(data))
+        except (FrameExpiredError, FrameReplacedError):
+            self.expired += 1
+            return
+        except FrameDecodeError as e:
+            self.rejected += 1
+            logger.debug(f"Rejected uploaded frame: {e}")
+            return
+        except Exception as e:
+            logger.error(f"Error processing uploaded frame: {e}")
+            return
+
+        start = time.perf_counter()
+        movements = self.controller.calculate_movements(face_data)
+        metrics.observe('controller', time.perf_counter() - start)
+
+        self._seq += 1
+        timestamp = time.time()
+        start = time.perf_counter()
+        if self.encoder is not None:
+            message = self.encoder.encode(self._seq, timestamp, movements)
+        else:
+            message = wire_format.encode(self._seq, timestamp, movements, face_data['detected'], self.protocol)
+        metrics.observe('serialize', time.perf_counter() - start)
+
+        self.processed += 1
+        if message is not None:
+            start = time.perf_counter()
+            try:
+                await self.send(message)
+            except ConnectionResetError:
+                return
+            metrics.observe('send', time.perf_counter() - start)
+
+    def stats(self) -> Dict:
+        """Upload counters for this connection."""
+        return {
+            'received_frames': self.received,
+            'processed_frames': self.processed,
+            'dropped_frames': self.dropped,
+            'rejected_frames': self.rejected,
+            'expired_frames': self.expired
+        }
+
+    async def close(self):
+        """Cancel any in-flight frame."""
+        if self._in_flight is not None and not self._in_flight.done():
+            self._in_flight.cancel()
+            await asyncio.gather(self._in_flight, return_exceptions=True)
+        CpuBudget.shared().remove_pipeline()
+        self.scheduler.forget(self)
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+class FrameScheduler:
+    """
+    Paces a loop against absolute monotonic-clock deadlines.
+    Work time does not stretch the period, and when the loop falls more than a
+    whole frame behind, the missed frames are skipped instead of replayed.
+    """
+
+    def __init__(self, fps: float = 30):
+        self.set_rate(fps)
+        self.reset()
+
+    def set_rate(self, fps: float):
+        """Change the target rate; takes effect on the next tick."""
+        self.fps = float(fps)
+        self.interval = 1.0 / self.fps
+
+    def reset(self):
+        """Forget the current deadline grid and statistics."""
+        self._deadline = None
+        self._window_start = None
+        self._window_ticks = 0
+        self.ticks = 0
+        self.missed = 0
+        self.skipped = 0
+        self.achieved_fps = 0.0
+
+    def _next_delay(self) -> float:
+        """Advance to the next deadline and return how long to wait for it."""
+        now = time.monotonic()
+        if self._deadline is None:
+            self._deadline = now
+            self._window_start = now
+
+        self._deadline += self.interval
+        delay = self._deadline - now
+        if delay < 0:
+            self.missed += 1
+            if -delay > self.interval:
+                # More than a whole frame behind: drop the backlog and resync
+                self.skipped += int(-delay / self.interval)
+                self._deadline = now
+            delay = 0.0
+
+        self._count_tick(now)
+        return delay
+
+    def _count_tick(self, now: float):
+        self.ticks += 1
+        self._window_ticks += 1
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.achieved_fps = self._window_ticks / elapsed
+            self._window_start = now
+            self._window_ticks = 0
+
+    async def wait(self):
+        """Sleep until the next deadline (event loop version)."""
+        delay = self._next_delay()
+        await asyncio.sleep(delay)
+
+    def sleep(self):
+        """Sleep until the next deadline (worker thread version)."""
+        delay = self._next_delay()
+        if delay > 0:
+            time.sleep(delay)
+
+    def stats(self) -> Dict:
+        """Achieved rate and deadline statistics."""
+        return {
+            'target_fps': self.fps,
+            'achieved_fps': round(self.achieved_fps, 2),
+            'ticks': self.ticks,
+            'deadline_misses': self.missed,
+            'skipped_frames': self.skipped
+        }
+
+def parse_rate(value: Optional[str], default: float, maximum: Optional[float] = None) -> float:
+    """Parse a client-requested rate, falling back to the default and capping it."""
+    try:
+        fps = float(value)
+    except (TypeError, ValueError):
+        return default
+    if fps <= 0:
+        return default
+    if maximum is not None:
+        fps = min(fps, maximum)
+    return fps
@@ -0,0 +1,255 @@
+import glob
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+from synthetic_face import draw_face
+
+# TRACKING_SOURCE selects the tracker input: camera (default), synthetic,
+# video:<path>, raw:<path> or images:<directory>
+SOURCE = os.environ.get('TRACKING_SOURCE', 'camera')
+
+# Playback rate of non-camera sources in frames per second; 0 = as fast as the
+# pipeline consumes them. Unset: the file's own rate, or 30
+SOURCE_FPS = os.environ.get('TRACKING_SOURCE_FPS')
+
+# How long a camera index that failed to open is remembered as missing
+CAMERA_PROBE_TTL = 60.0
+
+_camera_missing: Dict[int, float] = {}
+_camera_lock = threading.Lock()
+
+def open_camera(camera_index: int) -> Optional[cv2.VideoCapture]:
+    """
+    Open a camera, or return None without touching the device if the same index
+    failed to open within CAMERA_PROBE_TTL (headless hosts, every reconnect).
+    """
+    with _camera_lock:
+        failed_at = _camera_missing.get(camera_index)
+        if failed_at is not None and time.monotonic() - failed_at < CAMERA_PROBE_TTL:
+            return None
+
+    cap = cv2.VideoCapture(camera_index)
+    if not cap.isOpened():
+        cap.release()
+        with _camera_lock:
+            _camera_missing[camera_index] = time.monotonic()
+        return None
+
+    with _camera_lock:
+        _camera_missing.pop(camera_index, None)
+    return cap
+
+class FrameSource:
+    """
+    Where a tracker's BGR frames come from. Mirrors the part of cv2.VideoCapture
+    the trackers use (read(image=...), grab(), retrieve(image=...), isOpened(),
+    release()), so LatestFrameCapture drives every source the same way. grab()
+    waits for the next frame; retrieve() does the work of producing it.
+
+    Recorded and generated sources are paced at `fps` (0 = as fast as
+    possible) and are not `live`: the capture thread waits for each frame to
+    be consumed instead of dropping it, so every frame reaches the detector.
+    """
+
+    live = False
+
+    def __init__(self, fps: float = 30):
+        self.fps = fps
+        self._due = 0.0
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def grab(self) -> bool:
+        self._pace()
+        return self._grab()
+
+    def retrieve(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        return self._read(image)
+
+    def _grab(self) -> bool:
+        return True
+
+    def _read(self, image: Optional[np.ndarray]) -> Tuple[bool, Optional[np.ndarray]]:
+        raise NotImplementedError
+
+    def _pace(self):
+        if not self.fps:
+            return
+        now = time.monotonic()
+        if self._due > now:
+            time.sleep(self._due - now)
+        # Don't try to catch up after a stall
+        self._due = max(self._due, now) + 1.0 / self.fps
+
+    def isOpened(self) -> bool:
+        return True
+
+    def release(self):
+        pass
+
+class CameraSource(FrameSource):
+    """A webcam through cv2.VideoCapture; the device sets the pace."""
+
+    live = True
+
+    def __init__(self, cap: cv2.VideoCapture, capture_size: Tuple[int, int] = (640, 480)):
+        super().__init__(fps=0)
+        self.cap = cap
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, capture_size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, capture_size[1])
+
+    def _grab(self):
+        # Blocks until the device delivers the next frame
+        return self.cap.grab()
+
+    def _read(self, image):
+        return self.cap.retrieve(image=image) if image is not None else self.cap.retrieve()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+class VideoFileSource(FrameSource):
+    """A video file, looped; played at its own frame rate unless `fps` is given."""
+
+    def __init__(self, path: str, fps: Optional[float] = None, loop: bool = True):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise ValueError(f"cannot open video file '{path}'")
+        super().__init__(self.cap.get(cv2.CAP_PROP_FPS) or 30 if fps is None else fps)
+        self.loop = loop
+
+    def _read(self, image):
+        ok, frame = self.cap.read(image=image) if image is not None else self.cap.read()
+        if not ok and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read(image=image) if image is not None else self.cap.read()
+        return ok, frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+class RawFrameSource(FrameSource):
+    """
+    Memory-mapped file of uncompressed BGR frames, looped: a .npy array of shape
+    (frames, height, width, 3), or headerless bytes of `frame_size` frames.
+    Reading is a copy out of the page cache, with no decoding.
+    """
+
+    def __init__(self, path: str, frame_size: Tuple[int, int] = (640, 480), fps: float = 30, loop: bool = True):
+        super().__init__(fps)
+        if path.endswith('.npy'):
+            self.frames = np.load(path, mmap_mode='r')
+        else:
+            width, height = frame_size
+            self.frames = np.memmap(path, dtype=np.uint8, mode='r').reshape(-1, height, width, 3)
+        if self.frames.ndim != 4 or self.frames.shape[3] != 3 or not len(self.frames):
+            raise ValueError(f"'{path}' does not hold (frames, height, width, 3) BGR frames")
+        self.loop = loop
+        self.position = 0
+
+    def _read(self, image):
+        if self.position == len(self.frames):
+            if not self.loop:
+                return False, None
+            self.position = 0
+        frame = self.frames[self.position]
+        self.position += 1
+        if image is None or image.shape != frame.shape:
+            return True, np.array(frame)
+        np.copyto(image, frame)
+        return True, image
+
+class ImageDirectorySource(FrameSource):
+    """Still images from a directory, in file name order, looped."""
+
+    PATTERNS = ('*.png', '*.jpg', '*.jpeg', '*.bmp')
+
+    def __init__(self, directory: str, fps: float = 30, loop: bool = True):
+        super().__init__(fps)
+        self.paths = sorted(p for pattern in self.PATTERNS for p in glob.glob(os.path.join(directory, pattern)))
+        if not self.paths:
+            raise ValueError(f"no images in '{directory}'")
+        self.loop = loop
+        self.position = 0
+
+    def _read(self, image):
+        if self.position == len(self.paths):
+            if not self.loop:
+                return False, None
+            self.position = 0
+        frame = cv2.imread(self.paths[self.position], cv2.IMREAD_COLOR)
+        self.position += 1
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+class SyntheticFaceSource(FrameSource):
+    """
+    Generated frames of one face drifting, bobbing and changing size over a
+    noisy background, for exercising the real detect path without a camera.
+    """
+
+    def __init__(self, frame_size: Tuple[int, int] = (640, 480), fps: float = 30, seed: int = 0):
+        super().__init__(fps)
+        self.frame_size = frame_size
+        self.index = 0
+        self._gray = np.empty(frame_size[::-1], dtype=np.uint8)
+        # Pre-rendered noise, cycled, so generating a frame costs a few drawing calls
+        rng = np.random.default_rng(seed)
+        self._noise = rng.normal(0, 4, (8,) + self._gray.shape).astype(np.int8)
+
+    def _read(self, image):
+        width, height = self.frame_size
+        t = self.index / 30.0
+        size = int(height * (0.35 + 0.08 * np.sin(t * 0.4)))
+        cx = int(width * (0.5 + 0.25 * np.sin(t * 0.5)))
+        cy = int(height * (0.5 + 0.12 * np.cos(t * 0.3)))
+
+        self._gray.fill(110)
+        draw_face(self._gray, cx, cy, size)
+        cv2.add(self._gray, self._noise[self.index % len(self._noise)], dst=self._gray, dtype=cv2.CV_8U)
+        self.index += 1
+
+        if image is None or image.shape != self._gray.shape + (3,):
+            image = np.empty(self._gray.shape + (3,), dtype=np.uint8)
+        cv2.cvtColor(self._gray, cv2.COLOR_GRAY2BGR, dst=image)
+        return True, image
+
+def open_source(camera_index: Optional[int] = 0, capture_size: Tuple[int, int] = (640, 480),
+                spec: Optional[str] = None) -> Optional[FrameSource]:
+    """
+    The frame source named by `spec` (TRACKING_SOURCE by default), or None if
+    it is the camera and there is none.
+    """
+    spec = spec or SOURCE
+    fps = float(SOURCE_FPS) if SOURCE_FPS is not None else None
+    kind, _, path = spec.partition(':')
+    if kind == 'camera':
+        if camera_index is None:
+            return None
+        cap = open_camera(camera_index)
+        return CameraSource(cap, capture_size) if cap is not None else None
+    if kind == 'synthetic':
+        return SyntheticFaceSource(capture_size, 30 if fps is None else fps)
+    if kind == 'video':
+        return VideoFileSource(path, fps)
+    if kind == 'raw':
+        return RawFrameSource(path, capture_size, 30 if fps is None else fps)
+    if kind == 'images':
+        return ImageDirectorySource(path, 30 if fps is None else fps)
+    raise ValueError(f"unknown frame source '{spec}', expected camera, synthetic, video:<path>, raw:<path> or images:<dir>")
@@ -0,0 +1,203 @@
+import asyncio
+import time
+from bisect import bisect_left
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Upper bounds in seconds; detection dominates, serialization sits in the first buckets
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Pipeline stages timed on every frame
+STAGES = ('capture', 'grayscale', 'detect', 'track', 'controller', 'serialize', 'send')
+
+# How the face position of a frame was found
+FACE_METHODS = ('full_scan', 'roi_scan', 'flow', 'motion_gate')
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram.
+    Counts live in a preallocated array and observe() only bumps one slot,
+    so it is cheap enough to call on every frame. Increments from worker
+    threads are not locked; losing the odd count is fine for monitoring.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, counts: Optional[np.ndarray] = None,
+                 total: Optional[np.ndarray] = None):
+        self.bounds = tuple(buckets)
+        # One slot per bucket plus +Inf, and the running sum; may be views into shared memory
+        self.counts = np.zeros(len(self.bounds) + 1, dtype=np.int64) if counts is None else counts
+        self.total = np.zeros(1) if total is None else total
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.total[0] += seconds
+
+    def render(self, name: str, labels: str, lines: List[str]):
+        """Append Prometheus sample lines; `labels` is 'key="value",' or ''."""
+        cumulative = np.cumsum(self.counts)
+        for bound, count in zip(self.bounds, cumulative):
+            lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {cumulative[-1]}')
+        suffix = f'{{{labels.rstrip(",")}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {self.total[0]}')
+        lines.append(f'{name}_count{suffix} {cumulative[-1]}')
+
+# Stages timed where the tracker runs; shared across processes by SharedPipelineMetrics
+PIPELINE_STAGES = ('capture', 'grayscale', 'detect', 'track', 'controller')
+
+# Settings worth seeing next to the timings: name -> help
+GAUGES = {
+    'tracking_quality_level': 'Camera pipeline detection quality level (0 = best) chosen by the governor.',
+    'tracking_detection_scale': 'Scale of the frame copy the camera pipeline detects on.'
+}
+
+_FACE_METHOD_INDEX = {method: i for i, method in enumerate(FACE_METHODS)}
+_GAUGE_INDEX = {name: i for i, name in enumerate(GAUGES)}
+
+# Process-wide stage histograms
+stage_seconds: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+
+# Process-wide frame counts per face-finding method, in FACE_METHODS order
+face_frames = np.zeros(len(FACE_METHODS), dtype=np.int64)
+
+# Process-wide gauge values in GAUGES order; NaN until set
+gauge_values = np.full(len(GAUGES), np.nan)
+
+def set_gauge(name: str, value: float):
+    """Publish a setting or level declared in GAUGES on /metrics."""
+    gauge_values[_GAUGE_INDEX[name]] = value
+
+def observe(stage: str, seconds: float):
+    """Record one timing for a pipeline stage."""
+    stage_seconds[stage].observe(seconds)
+
+def count(method: str):
+    """Count one frame resolved by a face-finding method."""
+    face_frames[_FACE_METHOD_INDEX[method]] += 1
+
+# Layout of the shared block: pipeline stage histograms, face-method counts and gauges
+SHARED_DTYPE = np.dtype([
+    ('counts', '<i8', (len(PIPELINE_STAGES), len(DEFAULT_BUCKETS) + 1)),
+    ('totals', '<f8', (len(PIPELINE_STAGES), 1)),
+    ('face_frames', '<i8', (len(FACE_METHODS),)),
+    ('gauges', '<f8', (len(GAUGES),))
+])
+
+class SharedPipelineMetrics:
+    """
+    Pipeline metrics in shared memory, for multi-worker mode.
+    The capture process runs the tracker but serves no HTTP, so its stage
+    histograms, face-method counts and gauges would never reach /metrics.
+    After use() in every process of the deployment, those metrics are
+    recorded into (and rendered from) one shared block, so any worker a
+    scrape lands on reports the whole pipeline. The serialize and send
+    stages stay per process. Counts are not locked across processes either.
+    """
+
+    def __init__(self, name: Optional[str] = None, create: bool = False):
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=SHARED_DTYPE.itemsize if create else 0)
+        self.name = self.shm.name
+        self.owner = create
+        self._block = np.ndarray((), dtype=SHARED_DTYPE, buffer=self.shm.buf)
+        if create:
+            self._block['counts'] = 0
+            self._block['totals'] = 0.0
+            self._block['face_frames'] = 0
+            self._block['gauges'] = np.nan
+
+    def use(self):
+        """Point this process's pipeline metrics at the shared block."""
+        global face_frames, gauge_values
+        for i, stage in enumerate(PIPELINE_STAGES):
+            stage_seconds[stage] = Histogram(counts=self._block['counts'][i], total=self._block['totals'][i])
+        face_frames = self._block['face_frames']
+        gauge_values = self._block['gauges']
+
+    def close(self):
+        """Detach from the segment; the owner also removes it."""
+        del self._block
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic wakeup fires.
+    Anything blocking the loop (slow handlers, GIL-heavy work) shows up here.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.lag = 0.0
+        self.peak = 0.0
+        self.histogram = Histogram()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, time.perf_counter() - expected)
+            self.peak = max(self.peak, self.lag)
+            self.histogram.observe(self.lag)
+
+    def take_peak(self) -> float:
+        """Worst lag since the previous call."""
+        peak, self.peak = self.peak, 0.0
+        return peak
+
+def render(gauges: Dict[str, Tuple[str, str, float]],
+           client_gauges: Dict[str, Tuple[str, Dict[str, float]]],
+           loop_lag: Optional[LoopLagMonitor] = None) -> str:
+    """
+    Render everything in the Prometheus text exposition format.
+    `gauges` maps name -> (type, help, value); `client_gauges` maps
+    name -> (help, {client id: value}).
+    """
+    lines = [
+        '# HELP tracking_stage_seconds Time spent per frame in each pipeline stage.',
+        '# TYPE tracking_stage_seconds histogram'
+    ]
+    for stage, histogram in stage_seconds.items():
+        histogram.render('tracking_stage_seconds', f'stage="{stage}",', lines)
+
+    lines.append('# HELP tracking_face_frames_total Frames by how the face was found (detector scan, optical flow or reused while still).')
+    lines.append('# TYPE tracking_face_frames_total counter')
+    for method, frames in zip(FACE_METHODS, face_frames):
+        lines.append(f'tracking_face_frames_total{{method="{method}"}} {frames}')
+
+    if loop_lag is not None:
+        lines.append('# HELP tracking_event_loop_lag_seconds How late periodic event-loop wakeups fire.')
+        lines.append('# TYPE tracking_event_loop_lag_seconds histogram')
+        loop_lag.histogram.render('tracking_event_loop_lag_seconds', '', lines)
+
+    for (name, help_text), value in zip(GAUGES.items(), gauge_values):
+        if np.isnan(value):
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {value}')
+
+    for name, (kind, help_text, value) in gauges.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.append(f'{name} {value}')
+
+    for name, (help_text, values) in client_gauges.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for client, value in values.items():
+            lines.append(f'{name}{{client="{client}"}} {value}')
+
+    return '\n'.join(lines) + '\n'
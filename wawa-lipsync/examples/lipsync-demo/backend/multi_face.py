@@ -0,0 +1,257 @@
+import os
+import time
+from functools import partial
+from typing import Callable, Dict, Optional, Tuple
+import cv2
+import numpy as np
+import metrics
+from simple_face_tracker import SimpleFaceTracker
+
+# Mouth patches are compared at this size (width, height) to estimate who is talking
+MOUTH_SIZE = (16, 8)
+
+# Mean absolute mouth-patch change (gray levels, smoothed) that counts as speaking
+SPEAKING_ACTIVITY = 10.0
+
+ATTENTION_MODES = ('sticky', 'largest', 'speaker')
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise intersection-over-union of (n, 4) and (m, 4) x, y, w, h boxes."""
+    ax0, ay0 = a[:, 0:1], a[:, 1:2]
+    ax1, ay1 = ax0 + a[:, 2:3], ay0 + a[:, 3:4]
+    bx0, by0 = b[:, 0], b[:, 1]
+    bx1, by1 = bx0 + b[:, 2], by0 + b[:, 3]
+    inter_w = np.clip(np.minimum(ax1, bx1) - np.maximum(ax0, bx0), 0, None)
+    inter_h = np.clip(np.minimum(ay1, by1) - np.maximum(ay0, by0), 0, None)
+    inter = inter_w * inter_h
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+class FaceTracks:
+    """
+    Fixed-capacity table of tracked faces with persistent IDs.
+    Every per-target field is a column in a small preallocated array indexed by
+    slot; a slot with id 0 is free. Detections are associated to tracks greedily
+    by IoU, falling back to centroid distance for fast movers, in O(n*m).
+    """
+
+    def __init__(self, capacity: int = 8, min_iou: float = 0.3, max_misses: int = 5):
+        self.capacity = capacity
+        self.min_iou = min_iou
+        self.max_misses = max_misses
+        self.ids = np.zeros(capacity, dtype=np.int32)
+        self.boxes = np.zeros((capacity, 4), dtype=np.float32)
+        self.misses = np.zeros(capacity, dtype=np.int16)
+        self.activity = np.zeros(capacity, dtype=np.float32)
+        self.last_spoke = np.zeros(capacity, dtype=np.float64)
+        self.mouths = np.zeros((capacity, MOUTH_SIZE[1], MOUTH_SIZE[0]), dtype=np.uint8)
+        self._mouth = np.empty((MOUTH_SIZE[1], MOUTH_SIZE[0]), dtype=np.uint8)
+        self._next_id = 1
+
+    @property
+    def active(self) -> np.ndarray:
+        return self.ids > 0
+
+    def slot_of(self, track_id: int) -> Optional[int]:
+        slots = np.flatnonzero(self.ids == track_id)
+        return int(slots[0]) if len(slots) else None
+
+    def update(self, detections: np.ndarray, gray: np.ndarray, now: float):
+        """Associate (m, 4) detections, create tracks for new faces and expire lost ones."""
+        detections = self._suppress_duplicates(detections)
+        slots = np.flatnonzero(self.active)
+        matched_slots, matched_dets = self._associate(slots, detections)
+
+        self.misses[slots] += 1
+        for slot, det in zip(matched_slots, matched_dets):
+            self.boxes[slot] = detections[det]
+            self.misses[slot] = 0
+            self._update_mouth(slot, gray, now, new=False)
+
+        unmatched = np.setdiff1d(np.arange(len(detections)), matched_dets)
+        for det in unmatched:
+            free = np.flatnonzero(~self.active)
+            if not len(free):
+                break
+            slot = free[0]
+            self.ids[slot] = self._next_id
+            self._next_id += 1
+            self.boxes[slot] = detections[det]
+            self.misses[slot] = 0
+            self.activity[slot] = 0.0
+            self.last_spoke[slot] = 0.0
+            self._update_mouth(slot, gray, now, new=True)
+
+        self.ids[self.active & (self.misses > self.max_misses)] = 0
+
+    def _associate(self, slots: np.ndarray, detections: np.ndarray):
+        if not len(slots) or not len(detections):
+            return [], []
+        tracks = self.boxes[slots]
+        iou = iou_matrix(tracks, detections)
+
+        # Centroid distance relative to the track size, for faces that moved more than their width
+        centres = tracks[:, :2] + tracks[:, 2:] / 2
+        det_centres = detections[:, :2] + detections[:, 2:] / 2
+        distance = np.linalg.norm(centres[:, None, :] - det_centres[None, :, :], axis=2) / tracks[:, 2:3]
+        score = np.where(iou >= self.min_iou, 1.0 + iou, np.where(distance < 1.0, 1.0 - distance, 0.0))
+
+        matched_slots, matched_dets = [], []
+        for flat in np.argsort(score, axis=None)[::-1]:
+            t, d = divmod(int(flat), len(detections))
+            if score[t, d] <= 0:
+                break
+            if t in matched_slots or d in matched_dets:
+                continue
+            matched_slots.append(t)
+            matched_dets.append(d)
+        return [int(slots[t]) for t in matched_slots], matched_dets
+
+    @staticmethod
+    def _suppress_duplicates(detections: np.ndarray) -> np.ndarray:
+        # Overlapping ROI windows can report the same face twice
+        if len(detections) < 2:
+            return detections
+        overlap = iou_matrix(detections, detections)
+        keep = [i for i in range(len(detections)) if not (overlap[i, :i] > 0.5).any()]
+        return detections[keep]
+
+    def _update_mouth(self, slot: int, gray: np.ndarray, now: float, new: bool):
+        """Track mouth-region change as a cheap proxy for who is talking."""
+        x, y, w, h = self.boxes[slot]
+        x0, x1 = int(x + w * 0.25), int(x + w * 0.75)
+        y0, y1 = int(y + h * 0.65), int(y + h * 0.95)
+        if x1 <= x0 or y1 <= y0:
+            return
+        cv2.resize(gray[y0:y1, x0:x1], MOUTH_SIZE, dst=self._mouth, interpolation=cv2.INTER_AREA)
+        if not new:
+            change = cv2.norm(self._mouth, self.mouths[slot], cv2.NORM_L1) / self._mouth.size
+            self.activity[slot] = 0.7 * self.activity[slot] + 0.3 * change
+            if self.activity[slot] > SPEAKING_ACTIVITY:
+                self.last_spoke[slot] = now
+        np.copyto(self.mouths[slot], self._mouth)
+
+class AttentionPolicy:
+    """
+    Chooses which tracked face the avatar looks at.
+      largest  the biggest (closest) face, every frame
+      speaker  the face whose mouth moved most recently, largest if nobody spoke
+      sticky   stays on the current face until another is `hysteresis` times
+               larger for `min_hold` seconds, or the current one is lost
+    """
+
+    def __init__(self, mode: str = 'sticky', hysteresis: float = 1.5, min_hold: float = 1.0):
+        if mode not in ATTENTION_MODES:
+            raise ValueError(f"unknown attention mode '{mode}', expected one of {', '.join(ATTENTION_MODES)}")
+        self.mode = mode
+        self.hysteresis = hysteresis
+        self.min_hold = min_hold
+        self.target_id = 0
+        self._challenger_id = 0
+        self._challenger_since = 0.0
+
+    def choose(self, tracks: FaceTracks, now: float) -> Optional[int]:
+        """Returns the slot of the face to look at, or None."""
+        active = tracks.active
+        if not active.any():
+            self.target_id = 0
+            return None
+        area = np.where(active, tracks.boxes[:, 2] * tracks.boxes[:, 3], -1.0)
+        largest = int(np.argmax(area))
+
+        if self.mode == 'largest':
+            slot = largest
+        elif self.mode == 'speaker':
+            spoke = np.where(active, tracks.last_spoke, -1.0)
+            slot = int(np.argmax(spoke)) if spoke.max() > 0 else largest
+        else:
+            slot = self._sticky(tracks, area, largest, now)
+
+        self.target_id = int(tracks.ids[slot])
+        return slot
+
+    def _sticky(self, tracks: FaceTracks, area: np.ndarray, largest: int, now: float) -> int:
+        current = tracks.slot_of(self.target_id) if self.target_id else None
+        if current is None:
+            return largest
+        if largest == current or area[largest] < area[current] * self.hysteresis:
+            self._challenger_id = 0
+            return current
+
+        challenger = int(tracks.ids[largest])
+        if challenger != self._challenger_id:
+            self._challenger_id = challenger
+            self._challenger_since = now
+        if now - self._challenger_since >= self.min_hold:
+            self._challenger_id = 0
+            return largest
+        return current
+
+class MultiFaceTracker(SimpleFaceTracker):
+    """
+    SimpleFaceTracker that follows every face in view under a persistent ID and
+    looks at the one picked by the attention policy. Between full-frame scans
+    each face is re-detected in its own ROI; optical flow and the motion gate
+    are not used, since every face has to be observed to judge who is talking.
+    """
+
+    def __init__(self, camera_index: Optional[int] = 0, max_faces: int = 4, attention: str = 'sticky', **kwargs):
+        kwargs.setdefault('track', False)
+        kwargs.setdefault('motion_threshold', 0)
+        super().__init__(camera_index, **kwargs)
+        self.tracks = FaceTracks(capacity=max_faces)
+        self.attention = AttentionPolicy(attention)
+
+    def process_frame(self, gray: np.ndarray, timestamp: Optional[float] = None) -> Dict:
+        face_data = super().process_frame(gray, timestamp)
+        face_data['faces'] = int(self.tracks.active.sum())
+        face_data['target_id'] = self.attention.target_id
+        return face_data
+
+    def _find_face(self, gray: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """Update every track and return the box of the attention target."""
+        now = time.monotonic()
+        self._frames_since_full_scan += 1
+        start = time.perf_counter()
+
+        detections = []
+        if self.tracks.active.any() and self._frames_since_full_scan < self.full_scan_interval:
+            for slot in np.flatnonzero(self.tracks.active):
+                x, y, w, h = self.tracks.boxes[slot]
+                found = self._scan_roi(gray, (int(x), int(y), int(w), int(h)))
+                if found is not None:
+                    detections.append(found)
+            self.roi_scans += 1
+            metrics.count('roi_scan')
+
+        if not detections:
+            # Nobody tracked, everyone lost, or time to look for new faces
+            detections = self._scan_all(gray, (30, 30))
+            self.full_scans += 1
+            metrics.count('full_scan')
+            self._frames_since_full_scan = 0
+        metrics.observe('detect', time.perf_counter() - start)
+
+        self.tracks.update(np.array(detections, dtype=np.float32).reshape(-1, 4), gray, now)
+        previous_target = self.attention.target_id
+        slot = self.attention.choose(self.tracks, now)
+        if self.position_filter is not None and self.attention.target_id != previous_target:
+            # Jumping to another face is not motion: don't extrapolate it
+            self.position_filter.reset()
+        if slot is None:
+            self.last_face = None
+        else:
+            x, y, w, h = self.tracks.boxes[slot]
+            self.last_face = (int(x), int(y), int(w), int(h))
+        return self.last_face
+
+def tracker_factory_from_env() -> Callable:
+    """
+    Tracker factory for the camera pipeline: MultiFaceTracker when
+    TRACKING_MAX_FACES is above 1 (policy from TRACKING_ATTENTION), else SimpleFaceTracker.
+    """
+    max_faces = int(os.environ.get('TRACKING_MAX_FACES', 1))
+    if max_faces <= 1:
+        return SimpleFaceTracker
+    return partial(MultiFaceTracker, max_faces=max_faces,
+                   attention=os.environ.get('TRACKING_ATTENTION', 'sticky'))
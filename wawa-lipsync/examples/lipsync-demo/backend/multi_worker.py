@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import sys
+from pose_bus import PoseBus, run_pose_publisher
+from metrics import SharedPipelineMetrics
+
+logger = logging.getLogger(__name__)
+
+def run_worker(host: str, port: int, fps: float, bus_name: str, metrics_name: str, processes: int = 1,
+               process_index: int = 0):
+    """Server worker process: fans poses from the bus out to its own clients."""
+    from aiohttp_server import TrackingServer
+    from cpu_budget import CpuBudget
+
+    CpuBudget.configure(processes, process_index)
+    # Report the publisher's pipeline metrics on this worker's /metrics
+    pipeline_metrics = SharedPipelineMetrics(metrics_name)
+    pipeline_metrics.use()
+
+    server = TrackingServer(host=host, port=port, fps=fps, bus_name=bus_name, reuse_port=True)
+    try:
+        asyncio.run(server.start())
+    except KeyboardInterrupt:
+        pass
+
+def serve_multi_worker(host: str, port: int, workers: int, fps: float = None):
+    """
+    Run one capture/detect process and `workers` server processes bound to the
+    same port with SO_REUSEPORT; the kernel spreads connections across workers.
+    Returns when any process exits, after stopping the others.
+    """
+    fps = fps or float(os.environ.get('TRACKING_FPS', 30))
+    ctx = multiprocessing.get_context('spawn')
+    bus = PoseBus(create=True)
+    pipeline_metrics = SharedPipelineMetrics(create=True)
+
+    # The publisher and every worker get an equal slice of the CPU budget
+    count = workers + 1
+    processes = [ctx.Process(
+        target=run_pose_publisher, args=(bus.name, pipeline_metrics.name, fps, count, 0), name='pose-publisher'
+    )]
+    for i in range(workers):
+        processes.append(ctx.Process(
+            target=run_worker, args=(host, port, fps, bus.name, pipeline_metrics.name, count, i + 1),
+            name=f'tracking-worker-{i}'
+        ))
+
+    # Platforms stop services with SIGTERM; unwind so the children and the bus are cleaned up
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    logger.info(f"Starting {workers} workers on {host}:{port} with pose bus {bus.name}")
+    for process in processes:
+        process.start()
+
+    try:
+        # If any process dies, take the group down so the platform restarts us
+        multiprocessing.connection.wait([process.sentinel for process in processes])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+        bus.close()
+        pipeline_metrics.close()
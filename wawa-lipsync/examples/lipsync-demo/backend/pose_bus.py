@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+import numpy as np
+from wire_format import POSE_FIELDS, FLAG_BLINK, FLAG_DETECTED, ANIMATION_KEY, NO_ANIMATION
+
+logger = logging.getLogger(__name__)
+
+# One ring slot; `lock` is a seqlock counter (odd while the writer is inside the slot)
+SLOT_DTYPE = np.dtype([
+    ('lock', '<u8'),
+    ('seq', '<u8'),
+    ('timestamp', '<f8'),
+    ('angles', '<f8', (len(POSE_FIELDS),)),
+    ('animation', '<f8', (len(POSE_FIELDS),)),
+    ('flags', 'u1')
+], align=True)
+
+# Header holds the newest published sequence number, padded to a cache line
+HEADER_SIZE = 64
+
+# Attempts at a consistent slot read before giving up (e.g. the writer died mid-write)
+READ_RETRIES = 1000
+
+class PoseBus:
+    """
+    Shared-memory ring of pose frames, written by one capture process and read
+    by any number of server worker processes without locks or syscalls.
+    Every slot is guarded by a seqlock, so readers never see a torn frame.
+    """
+
+    def __init__(self, name: Optional[str] = None, create: bool = False, slots: int = 64):
+        size = HEADER_SIZE + slots * SLOT_DTYPE.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.shm.name
+        self.slots = (self.shm.size - HEADER_SIZE) // SLOT_DTYPE.itemsize
+        self.owner = create
+
+        self._head = np.ndarray((1,), dtype='<u8', buffer=self.shm.buf)
+        self._ring = np.ndarray((self.slots,), dtype=SLOT_DTYPE, buffer=self.shm.buf, offset=HEADER_SIZE)
+        if create:
+            self._head[0] = 0
+            self._ring[:] = np.zeros(self.slots, dtype=SLOT_DTYPE)
+
+    def publish(self, seq: int, timestamp: float, movements: Dict, detected: bool):
+        """Write one frame (single writer only)."""
+        slot = self._ring[seq % self.slots]
+        lock = int(slot['lock'])
+
+        slot['lock'] = lock + 1
+        slot['seq'] = seq
+        slot['timestamp'] = timestamp
+        slot['angles'] = [movements[group][axis] for group, axis in POSE_FIELDS]
+        slot['animation'] = movements.get(ANIMATION_KEY) or NO_ANIMATION
+        slot['flags'] = (FLAG_BLINK if movements.get('blink') else 0) | (FLAG_DETECTED if detected else 0)
+        slot['lock'] = lock + 2
+
+        self._head[0] = seq
+
+    @property
+    def head(self) -> int:
+        """Sequence number of the newest published frame (0 before the first)."""
+        return int(self._head[0])
+
+    def read(self, seq: int) -> Optional[Tuple[int, float, Dict, bool]]:
+        """
+        Read frame `seq`; returns (seq, timestamp, movements, detected), or None
+        if it has already been overwritten or no consistent read succeeded.
+        """
+        slot = self._ring[seq % self.slots]
+        for _ in range(READ_RETRIES):
+            before = int(slot['lock'])
+            if before & 1:
+                # Writer is inside this slot right now
+                continue
+            frame_seq = int(slot['seq'])
+            timestamp = float(slot['timestamp'])
+            angles = slot['angles'].tolist()
+            animation = tuple(slot['animation'].tolist())
+            flags = int(slot['flags'])
+            if int(slot['lock']) == before:
+                break
+        else:
+            return None
+
+        if frame_seq != seq:
+            return None
+
+        movements = {'body': {}, 'head': {}, 'eyes': {}}
+        for (group, axis), value in zip(POSE_FIELDS, angles):
+            movements[group][axis] = value
+        movements['blink'] = bool(flags & FLAG_BLINK)
+        movements[ANIMATION_KEY] = animation
+        return frame_seq, timestamp, movements, bool(flags & FLAG_DETECTED)
+
+    def read_latest(self) -> Optional[Tuple[int, float, Dict, bool]]:
+        """Read the newest frame, or None before anything was published."""
+        head = self.head
+        if head == 0:
+            return None
+        return self.read(head)
+
+    def close(self):
+        """Detach from the segment; the owner also removes it."""
+        del self._head, self._ring
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+class BusPoseSource:
+    """Pose source for worker processes: follows the newest frame on a PoseBus."""
+
+    def __init__(self, bus_name: str, scheduler):
+        self.bus_name = bus_name
+        self.scheduler = scheduler
+        self.bus = None
+        self._last_seq = 0
+
+    def start(self):
+        self.bus = PoseBus(self.bus_name)
+        self.scheduler.reset()
+
+    async def next_pose(self):
+        """Wait for a frame newer than the last one; returns (seq, timestamp, face_data, movements)."""
+        while True:
+            await self.scheduler.wait()
+            frame = self.bus.read_latest()
+            if frame is not None and frame[0] != self._last_seq:
+                seq, timestamp, movements, detected = frame
+                self._last_seq = seq
+                return seq, timestamp, {'detected': detected}, movements
+
+    async def release(self):
+        if self.bus is not None:
+            self.bus.close()
+            self.bus = None
+
+def run_pose_publisher(bus_name: str, metrics_name: str, fps: float = 30, processes: int = 1,
+                       process_index: int = 0):
+    """
+    Capture process entry point: run the only tracker and controller on this box
+    and publish every pose to the bus. Stage timings go to the shared metrics
+    block the server workers render.
+    """
+    from multi_face import tracker_factory_from_env
+    from cpu_budget import CpuBudget
+    from frame_scheduler import FrameScheduler
+    from metrics import SharedPipelineMetrics
+    from tracking_hub import LocalPoseSource
+
+    logging.basicConfig(level=logging.INFO)
+    budget = CpuBudget.configure(processes, process_index)
+    logger.info(f"CPU budget: {budget.stats()}")
+    pipeline_metrics = SharedPipelineMetrics(metrics_name)
+    pipeline_metrics.use()
+    bus = PoseBus(bus_name)
+    # Same tracker thread and timed controller stage as the single-process hub
+    source = LocalPoseSource(tracker_factory_from_env(), FrameScheduler(fps))
+    logger.info(f"Pose publisher running at {fps} FPS on bus {bus_name}")
+
+    async def run():
+        seq = bus.head
+        source.start()
+        try:
+            while True:
+                _, timestamp, face_data, movements = await source.next_pose()
+                seq += 1
+                bus.publish(seq, timestamp or time.time(), movements,
+                            bool(face_data and face_data.get('detected')))
+        finally:
+            await source.release()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bus.close()
@@ -0,0 +1,95 @@
+import math
+import os
+from typing import Optional, Union
+import numpy as np
+
+# Extra time between the face position being computed and the avatar showing it
+# (network, browser frame, render); the filter predicts this far past the frame's age
+DISPLAY_DELAY = float(os.environ.get('TRACKING_DISPLAY_DELAY_MS', 50)) / 1000
+
+def _alpha(dt: np.ndarray, cutoff: Union[float, np.ndarray]) -> np.ndarray:
+    # Exponential smoothing factor of a first-order low-pass at `cutoff` Hz
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return dt / (dt + tau)
+
+class OneEuroFilter:
+    """
+    One-Euro filter with velocity extrapolation over a block of targets.
+
+    State is a fixed (targets, dims) array of filtered values and velocities plus
+    one timestamp per target, so filtering many faces is one vectorized call.
+    The cutoff rises with speed (min_cutoff + beta * |velocity|): a still face
+    is heavily smoothed, a moving one is followed with little lag. Passing
+    `lead` extrapolates the output along the filtered velocity, to where the
+    face will be when the frame is displayed. Extrapolation fades in between
+    still_speed and twice that, so sensor noise on a still face is never
+    projected forward.
+    """
+
+    def __init__(self, targets: int = 1, dims: int = 3, min_cutoff: float = 0.3, beta: float = 10.0,
+                 d_cutoff: float = 1.0, max_gap: float = 0.5, still_speed: float = 0.1):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        # Filtered speed (units per second) below which the output is not extrapolated
+        self.still_speed = still_speed
+        # A target unseen for longer than this restarts from its next measurement
+        self.max_gap = max_gap
+        self.value = np.zeros((targets, dims))
+        self.velocity = np.zeros((targets, dims))
+        self.stamp = np.zeros(targets)
+        self._out = np.empty((targets, dims))
+
+    def reset(self, rows: Optional[np.ndarray] = None):
+        """Forget targets (all by default); their next measurement is taken as-is."""
+        self.stamp[slice(None) if rows is None else rows] = 0.0
+
+    def __call__(self, measured: np.ndarray, t: Union[float, np.ndarray], lead: float = 0.0,
+                 rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Filter `measured` ((targets, dims), or (len(rows), dims) for a subset)
+        taken at time `t` seconds. Returns the filtered values extrapolated by
+        `lead` seconds, as a view of an internal buffer valid until the next call.
+        """
+        rows = slice(None) if rows is None else rows
+        measured = np.asarray(measured, dtype=np.float64).reshape(self.value[rows].shape)
+        stamp = self.stamp[rows]
+        dt = np.broadcast_to(np.asarray(t, dtype=np.float64), stamp.shape) - stamp
+        restart = (stamp == 0) | (dt > self.max_gap)
+
+        value, velocity = self.value[rows], self.velocity[rows]
+        dt = np.where(restart, 1.0, np.maximum(dt, 1e-3))[:, None]
+        raw_velocity = (measured - value) / dt
+        velocity += _alpha(dt, self.d_cutoff) * (raw_velocity - velocity)
+        speed = np.abs(velocity)
+        cutoff = self.min_cutoff + self.beta * np.maximum(speed - self.still_speed, 0.0)
+        value += _alpha(dt, cutoff) * (measured - value)
+
+        value[restart] = measured[restart]
+        velocity[restart] = 0.0
+        self.value[rows] = value
+        self.velocity[rows] = velocity
+        self.stamp[rows] = t
+
+        out = self._out[rows]
+        gain = np.clip(speed / self.still_speed - 1.0, 0.0, 1.0)
+        np.multiply(velocity, gain, out=out)
+        out *= lead
+        out += value
+        return out
+
+def filter_from_env() -> Optional[OneEuroFilter]:
+    """
+    The trackers' position filter: TRACKING_FILTER=one_euro enables the
+    predictive filter (tuned by TRACKING_FILTER_MIN_CUTOFF and TRACKING_FILTER_BETA);
+    the default 'ema' keeps the fixed exponential smoothing.
+    """
+    mode = os.environ.get('TRACKING_FILTER', 'ema')
+    if mode == 'ema':
+        return None
+    if mode != 'one_euro':
+        raise ValueError(f"unknown filter '{mode}', expected 'ema' or 'one_euro'")
+    return OneEuroFilter(
+        min_cutoff=float(os.environ.get('TRACKING_FILTER_MIN_CUTOFF', 0.3)),
+        beta=float(os.environ.get('TRACKING_FILTER_BETA', 10.0))
+    )
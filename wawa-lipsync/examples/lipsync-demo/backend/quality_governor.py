@@ -0,0 +1,89 @@
+import logging
+import time
+from typing import NamedTuple, Sequence
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class QualityLevel(NamedTuple):
+    scale: float          # multiplies the tracker's configured detection scale
+    scale_factor: float   # cascade pyramid step
+    min_neighbors: int    # cascade votes needed per face
+    roi_padding: float    # ROI window padding, fraction of the face size
+    cadence: float        # multiplies the detect and full-scan intervals
+
+# From best to cheapest; level 0 is the tracker's own configuration
+QUALITY_LEVELS = (
+    QualityLevel(1.0, 1.1, 5, 0.5, 1.0),
+    QualityLevel(0.75, 1.15, 4, 0.4, 1.5),
+    QualityLevel(0.5, 1.2, 4, 0.35, 2.0),
+    QualityLevel(0.5, 1.3, 3, 0.25, 3.0),
+    QualityLevel(0.35, 1.3, 3, 0.2, 4.5),
+)
+
+class QualityGovernor:
+    """
+    Holds a tracker to its frame budget by trading detection quality for time.
+    Per-frame face-finding time is averaged; while the average is over
+    budget_share of the frame budget the tracker steps to a cheaper level, at
+    most once per step_interval. After recover_after seconds below half the
+    budget it steps back up, one level at a time. The gap between the two
+    thresholds and the longer recovery wait keep it from oscillating.
+    Only the governor with `publish` set (the camera pipeline's) reports its
+    level on /metrics, so upload sessions don't overwrite the gauges.
+    """
+
+    def __init__(self, tracker, target_fps: float = 30, levels: Sequence[QualityLevel] = QUALITY_LEVELS,
+                 budget_share: float = 0.75, step_interval: float = 1.0, recover_after: float = 10.0,
+                 publish: bool = True):
+        self.tracker = tracker
+        self.publish = publish
+        self.levels = levels
+        self.budget = budget_share / target_fps
+        self.step_interval = step_interval
+        self.recover_after = recover_after
+        self.base_scale = tracker.detection_scale
+        self.base_intervals = (tracker.detect_interval, tracker.full_scan_interval)
+        self.level = 0
+        self.frame_time = 0.0
+        self._last_step = time.monotonic()
+        self._calm_since = None
+        self.apply(0)
+
+    def observe(self, seconds: float):
+        """Feed the time one frame took to resolve; may change the tracker's settings."""
+        self.frame_time += (seconds - self.frame_time) * 0.1
+        now = time.monotonic()
+
+        if self.frame_time > self.budget:
+            self._calm_since = None
+            if self.level < len(self.levels) - 1 and now - self._last_step >= self.step_interval:
+                self._step(self.level + 1, now)
+        elif self.frame_time < self.budget / 2:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif self.level > 0 and now - self._calm_since >= self.recover_after:
+                self._calm_since = now
+                self._step(self.level - 1, now)
+        else:
+            self._calm_since = None
+
+    def _step(self, level: int, now: float):
+        logger.info(f"Tracking quality level {self.level} -> {level} "
+                    f"(frame time {self.frame_time * 1000:.1f} ms, budget {self.budget * 1000:.1f} ms)")
+        self._last_step = now
+        self.apply(level)
+
+    def apply(self, level: int):
+        settings = self.levels[level]
+        self.level = level
+        tracker = self.tracker
+        tracker.detection_scale = min(1.0, self.base_scale * settings.scale)
+        tracker.scale_factor = settings.scale_factor
+        tracker.min_neighbors = settings.min_neighbors
+        tracker.roi_padding = settings.roi_padding
+        tracker.detect_interval = round(self.base_intervals[0] * settings.cadence)
+        tracker.full_scan_interval = round(self.base_intervals[1] * settings.cadence)
+        if self.publish:
+            metrics.set_gauge('tracking_quality_level', level)
+            metrics.set_gauge('tracking_detection_scale', tracker.detection_scale)
@@ -8,16 +8,24 @@ import os
 import sys
 import asyncio
 from aiohttp_server import TrackingServer
+from multi_worker import serve_multi_worker
 
 def main():
     # Get port from Render environment
     port = int(os.environ.get('PORT', 8765))
+    workers = int(os.environ.get('TRACKING_WORKERS', 1))
     
     print(f"Starting Aisha Eye Tracking Server on port {port}")
     print("Environment: Render")
     print("Using aiohttp server (HTTP + WebSocket)")
     print("Using simplified face tracker (OpenCV only)")
     
+    if workers > 1:
+        # One capture process plus N workers sharing the port
+        print(f"Using {workers} worker processes with a shared-memory pose bus")
+        serve_multi_worker('0.0.0.0', port, workers)
+        return
+    
     # Create server with Render port
     server = TrackingServer(host='0.0.0.0', port=port)
     
@@ -1,22 +1,119 @@
 import cv2
 import numpy as np
-from typing import Optional, Dict
+import os
+from typing import Optional, Dict, List, Tuple
 import time
+import metrics
+from flow_tracker import FlowTracker
+from face_detectors import FaceDetector, default_detector
+from frame_capture import LatestFrameCapture
+from frame_sources import FrameSource, open_source
+from pose_filter import DISPLAY_DELAY, OneEuroFilter, filter_from_env
+from quality_governor import QualityGovernor
+
+# ROI search: window padding (fraction of the last face size on each side)
+# and the face size range accepted inside it, relative to the last face
+ROI_PADDING = 0.5
+ROI_SIZE_RANGE = (0.7, 1.4)
+
+# Motion gate: frames are compared on a thumbnail this size (width, height)
+THUMBNAIL_SIZE = (64, 48)
+
+# Detection runs on a copy downscaled by this factor (1.0 = full resolution)
+DETECTION_SCALE = float(os.environ.get('TRACKING_DETECTION_SCALE', 1.0))
+
+# Re-detect a face found on the downscaled copy at full resolution inside its ROI
+DETECTION_REFINE = os.environ.get('TRACKING_DETECTION_REFINE', '0') == '1'
+
+# Motion gate: mean gray-level change in the face region below which the last face is reused; 0 disables
+MOTION_THRESHOLD = float(os.environ.get('TRACKING_MOTION_THRESHOLD', 2.0))
+
+# Frame rate the quality governor holds the tracker to; 0 disables it
+TARGET_FPS = float(os.environ.get('TRACKING_TARGET_FPS', os.environ.get('TRACKING_FPS', 30)))
+
+def warm_up(camera_index: Optional[int] = 0):
+    """
+    Pay one-off startup costs before the first client connects: pick and
+    load the detector backend, run a first detection and probe the frame
+    source (the camera unless TRACKING_SOURCE names another).
+    """
+    default_detector().warm_up()
+
+    if camera_index is not None:
+        source = open_source(camera_index)
+        if source is not None:
+            source.release()
 
 class SimpleFaceTracker:
-    """Simplified face tracker using OpenCV's built-in Haar cascades for Render deployment."""
+    """
+    Simplified face tracker for Render deployment.
+    Uses OpenCV's built-in Haar cascade by default, or any FaceDetector backend.
+    """
     
-    def __init__(self, camera_index: int = 0):
-        # Use OpenCV's built-in face cascade (no MediaPipe dependency)
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    def __init__(self, camera_index: Optional[int] = 0, roi: bool = True, full_scan_interval: int = 30,
+                 track: bool = True, detect_interval: int = 10, detection_scale: Optional[float] = None,
+                 refine: Optional[bool] = None, capture_size: Tuple[int, int] = (640, 480),
+                 detector: Optional[FaceDetector] = None, motion_threshold: Optional[float] = None,
+                 max_staleness: float = 0.5, position_filter: Optional[OneEuroFilter] = None,
+                 source: Optional[FrameSource] = None, target_fps: Optional[float] = None):
+        # Process-wide backend unless one is given (Haar unless configured or benchmarked otherwise)
+        self.detector = detector or default_detector()
+        
+        # Frame source: the one given, else TRACKING_SOURCE (the camera by default).
+        # None when frames are supplied by the caller or there is no camera
+        self.source = source
+        self.capture = None
+        if source is None and camera_index is not None:
+            self.source = open_source(camera_index, capture_size)
+        if self.source is not None:
+            # Grab continuously so we always process the newest frame
+            self.capture = LatestFrameCapture(self.source)
+            self.capture.start()
+        self._gray = None
         
-        # Initialize camera
-        self.cap = cv2.VideoCapture(camera_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        # ROI mode: search around the last face, full-frame scan on loss or every N frames
+        self.roi = roi
+        self.roi_padding = ROI_PADDING
+        self.full_scan_interval = full_scan_interval
+        self.last_face: Optional[Tuple[int, int, int, int]] = None
+        self.full_scans = 0
+        self.roi_scans = 0
+        self._frames_since_full_scan = 0
         
-        # Smoothing parameters
+        # Motion gate: skip the detector while the face region is still (mean absolute difference
+        # in gray levels below motion_threshold), for at most max_staleness seconds
+        self.motion_threshold = MOTION_THRESHOLD if motion_threshold is None else motion_threshold
+        self.max_staleness = max_staleness
+        self.gated_frames = 0
+        self._thumbnail = np.empty(THUMBNAIL_SIZE[::-1], dtype=np.uint8)
+        self._reference = np.empty_like(self._thumbnail)
+        self._difference = np.empty_like(self._thumbnail)
+        self._reference_time = None
+        
+        # Detect on a downscaled copy; optionally refine the box at full resolution
+        self.detection_scale = min(1.0, detection_scale or DETECTION_SCALE)
+        self.refine = DETECTION_REFINE if refine is None else refine
+        self._small = None
+        if self.source is not None:
+            # Only the capture pipeline reports its settings; upload sessions would overwrite them
+            metrics.set_gauge('tracking_detection_scale', self.detection_scale)
+        
+        # Tracking mode: optical flow between detections, detector every N frames or on drift
+        self.flow = FlowTracker() if track else None
+        self.detect_interval = detect_interval
+        self.tracked_frames = 0
+        self._frames_since_detection = 0
+        
+        # Cascade tuning, stepped down together with the settings above when frames run over budget
+        self.scale_factor = 1.1
+        self.min_neighbors = 5
+        target_fps = TARGET_FPS if target_fps is None else target_fps
+        self.governor = (QualityGovernor(self, target_fps, publish=self.source is not None)
+                         if target_fps else None)
+        
+        # Smoothing parameters; a predictive filter (TRACKING_FILTER) replaces the fixed factor
         self.smooth_factor = 0.15
+        self.position_filter = position_filter or filter_from_env()
         self.current_position = {'x': 0.5, 'y': 0.5, 'z': 0.5}
         self.detection_confidence = 0.0
         
@@ -25,44 +122,55 @@ class SimpleFaceTracker:
         self.demo_time = time.time()
     
     def get_face_position(self) -> Optional[Dict]:
-        """Capture frame and detect face position using OpenCV Haar cascades."""
+        """Capture frame and detect face position."""
         
         # Check if we're in a headless environment (like Render)
-        if not self.cap.isOpened():
+        if self.capture is None:
             return self._get_demo_position()
         
-        ret, frame = self.cap.read()
-        if not ret:
+        frame, captured_at = self.capture.read()
+        if frame is None:
             return self._get_demo_position()
         
-        # Convert to grayscale for face detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        # Convert to grayscale for face detection, into a reused buffer
+        start = time.perf_counter()
+        if self._gray is None or self._gray.shape != frame.shape[:2]:
+            self._gray = np.empty(frame.shape[:2], dtype=np.uint8)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        metrics.observe('grayscale', time.perf_counter() - start)
         
-        # Detect faces
-        faces = self.face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(30, 30)
-        )
+        face_data = self.process_frame(self._gray, captured_at)
+        face_data['timestamp'] = captured_at
+        return face_data
+    
+    def process_frame(self, gray: np.ndarray, timestamp: Optional[float] = None) -> Dict:
+        """
+        Detect the largest face in a grayscale frame and update the smoothed position.
+        `timestamp` is the frame's capture time (now if not given).
+        """
+        start = time.perf_counter()
+        face = self._find_face(gray)
+        if self.governor is not None:
+            self.governor.observe(time.perf_counter() - start)
         
-        if len(faces) > 0:
-            # Get the largest face
-            face = max(faces, key=lambda x: x[2] * x[3])
+        if face is not None:
             x, y, w, h = face
             
             # Calculate center of face
-            center_x = (x + w/2) / frame.shape[1]  # Normalize to 0-1
-            center_y = (y + h/2) / frame.shape[0]  # Normalize to 0-1
+            center_x = (x + w/2) / gray.shape[1]  # Normalize to 0-1
+            center_y = (y + h/2) / gray.shape[0]  # Normalize to 0-1
             
             # Estimate depth based on face size
-            face_size = (w * h) / (frame.shape[0] * frame.shape[1])
+            face_size = (w * h) / (gray.shape[0] * gray.shape[1])
             center_z = min(1.0, face_size * 4)
             
-            # Apply smoothing for stable tracking
-            self.current_position['x'] += (center_x - self.current_position['x']) * self.smooth_factor
-            self.current_position['y'] += (center_y - self.current_position['y']) * self.smooth_factor
-            self.current_position['z'] += (center_z - self.current_position['z']) * self.smooth_factor
+            if self.position_filter is not None:
+                self._predict_position((center_x, center_y, center_z), timestamp)
+            else:
+                # Apply smoothing for stable tracking
+                self.current_position['x'] += (center_x - self.current_position['x']) * self.smooth_factor
+                self.current_position['y'] += (center_y - self.current_position['y']) * self.smooth_factor
+                self.current_position['z'] += (center_z - self.current_position['z']) * self.smooth_factor
             
             self.detection_confidence = 0.8  # High confidence for detected face
             
@@ -71,11 +179,166 @@ class SimpleFaceTracker:
                 'y': self.current_position['y'],
                 'z': self.current_position['z'],
                 'confidence': self.detection_confidence,
-                'detected': True
+                'detected': True,
+                'filtered': self.position_filter is not None
             }
         
         return {'detected': False, 'confidence': 0.0}
     
+    def _predict_position(self, center: Tuple[float, float, float], timestamp: Optional[float]):
+        """Filter the measured centre and extrapolate it to when the pose will be displayed."""
+        now = time.time()
+        captured_at = timestamp or now
+        lead = max(0.0, now - captured_at) + DISPLAY_DELAY
+        x, y, z = np.clip(self.position_filter(center, captured_at, lead)[0], 0.0, 1.0)
+        self.current_position.update(x=float(x), y=float(y), z=float(z))
+    
+    def _find_face(self, gray: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """Largest face as (x, y, w, h) in frame pixels: tracked, or detected when due."""
+        if self.motion_threshold and self._still(gray):
+            face = self.last_face
+            if self.flow is not None and self.flow.points is not None:
+                # The gate skips the detector only: optical flow still follows the face, so the
+                # box stays current and every flow step spans one frame
+                start = time.perf_counter()
+                face = self.flow.update(gray)
+                metrics.observe('track', time.perf_counter() - start)
+            if face is not None:
+                self.gated_frames += 1
+                metrics.count('motion_gate')
+                self.last_face = face
+                return face
+            # Flow lost the face: fall through to the detector
+        
+        self._frames_since_full_scan += 1
+        self._frames_since_detection += 1
+        
+        if self.flow is not None and self.last_face is not None and self._frames_since_detection < self.detect_interval:
+            start = time.perf_counter()
+            face = self.flow.update(gray)
+            metrics.observe('track', time.perf_counter() - start)
+            if face is not None:
+                self.tracked_frames += 1
+                metrics.count('flow')
+                self.last_face = face
+                return face
+            # Lost or drifted: re-acquire with the detector right away
+        
+        start = time.perf_counter()
+        face = self._detect(gray)
+        metrics.observe('detect', time.perf_counter() - start)
+        self._frames_since_detection = 0
+        
+        if self.flow is not None:
+            if face is None or not self.flow.start(gray, face):
+                # Nothing to follow (or too little texture): detect again next frame
+                self.flow.reset()
+        return face
+    
+    def _still(self, gray: np.ndarray) -> bool:
+        """
+        Whether the face region barely changed since the last processed frame.
+        A processed frame becomes the new reference, so slow drift still adds up.
+        """
+        cv2.resize(gray, THUMBNAIL_SIZE, dst=self._thumbnail, interpolation=cv2.INTER_AREA)
+        now = time.monotonic()
+        
+        if (self.last_face is not None and self._reference_time is not None
+                and now - self._reference_time < self.max_staleness):
+            # Face box in thumbnail pixels, padded by one pixel
+            sx, sy = THUMBNAIL_SIZE[0] / gray.shape[1], THUMBNAIL_SIZE[1] / gray.shape[0]
+            x, y, w, h = self.last_face
+            x0, y0 = max(0, int(x * sx) - 1), max(0, int(y * sy) - 1)
+            x1, y1 = int((x + w) * sx) + 2, int((y + h) * sy) + 2
+            region = (slice(y0, y1), slice(x0, x1))
+            cv2.absdiff(self._thumbnail[region], self._reference[region], dst=self._difference[region])
+            if cv2.mean(self._difference[region])[0] < self.motion_threshold:
+                return True
+        
+        np.copyto(self._reference, self._thumbnail)
+        self._reference_time = now
+        return False
+    
+    def _detect(self, gray: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        """Run the detector, searching near the last face first."""
+        if self.roi and self.last_face is not None and self._frames_since_full_scan < self.full_scan_interval:
+            face = self._scan_roi(gray, self.last_face)
+            if face is not None:
+                self.roi_scans += 1
+                metrics.count('roi_scan')
+                self.last_face = face
+                return face
+        
+        # Lost the face, or time for a full scan to pick up anyone new
+        self.full_scans += 1
+        metrics.count('full_scan')
+        self._frames_since_full_scan = 0
+        face = self._scan(gray, (30, 30))
+        if face is not None and self.refine and self.detection_scale < 1.0:
+            # The downscaled box is only accurate to 1/scale pixels
+            face = self._scan_roi(gray, face, full_resolution=True) or face
+        self.last_face = face
+        return face
+    
+    def stats(self) -> Dict:
+        """How frames were resolved: full-frame scans, ROI scans, optical flow or the motion gate."""
+        return {
+            'detector_frames': self.full_scans + self.roi_scans,
+            'tracker_frames': self.tracked_frames,
+            'gated_frames': self.gated_frames,
+            'full_scans': self.full_scans,
+            'roi_scans': self.roi_scans,
+            'quality_level': self.governor.level if self.governor is not None else 0
+        }
+    
+    def _scan_roi(self, gray: np.ndarray, face: Tuple[int, int, int, int],
+                  full_resolution: bool = False) -> Optional[Tuple[int, int, int, int]]:
+        """Search a padded window around `face` for a face of similar size."""
+        x, y, w, h = face
+        pad = int(max(w, h) * self.roi_padding)
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(gray.shape[1], x + w + pad), min(gray.shape[0], y + h + pad)
+        
+        # Slicing is a view, no copy
+        size = max(w, h)
+        min_size = int(size * ROI_SIZE_RANGE[0])
+        max_size = int(size * ROI_SIZE_RANGE[1])
+        found = self._scan(gray[y0:y1, x0:x1], (min_size, min_size), (max_size, max_size), full_resolution)
+        if found is None:
+            return None
+        fx, fy, fw, fh = found
+        return fx + x0, fy + y0, fw, fh
+    
+    def _scan(self, image: np.ndarray, min_size: Tuple[int, int], max_size: Tuple[int, int] = (0, 0),
+              full_resolution: bool = False) -> Optional[Tuple[int, int, int, int]]:
+        """Run the detector over `image` (downscaled by detection_scale) and return the largest face."""
+        faces = self._scan_all(image, min_size, max_size, full_resolution)
+        if not faces:
+            return None
+        return max(faces, key=lambda f: f[2] * f[3])
+    
+    def _scan_all(self, image: np.ndarray, min_size: Tuple[int, int], max_size: Tuple[int, int] = (0, 0),
+                  full_resolution: bool = False) -> List[Tuple[int, int, int, int]]:
+        """Every face in `image` (downscaled by detection_scale), in full-resolution pixels."""
+        scale = 1.0 if full_resolution else self.detection_scale
+        if scale < 1.0:
+            image = self._downscale(image, scale)
+            min_size = (int(min_size[0] * scale), int(min_size[1] * scale))
+            max_size = (int(max_size[0] * scale), int(max_size[1] * scale))
+        
+        faces = self.detector.detect_all(image, min_size, max_size, self.scale_factor, self.min_neighbors)
+        if scale == 1.0:
+            return faces
+        return [(int(x / scale), int(y / scale), int(w / scale), int(h / scale)) for x, y, w, h in faces]
+    
+    def _downscale(self, image: np.ndarray, scale: float) -> np.ndarray:
+        """Resize into a reused buffer; returns a view of it."""
+        width, height = max(1, int(image.shape[1] * scale)), max(1, int(image.shape[0] * scale))
+        if self._small is None or self._small.shape[0] < height or self._small.shape[1] < width:
+            self._small = np.empty((height, width), dtype=np.uint8)
+        return cv2.resize(image, (width, height), dst=self._small[:height, :width],
+                          interpolation=cv2.INTER_AREA)
+    
     def _get_demo_position(self) -> Dict:
         """Generate demo face position for headless environments."""
         if not self.demo_mode:
@@ -98,6 +361,13 @@ class SimpleFaceTracker:
     
     def release(self):
         """Clean up resources."""
-        if self.cap.isOpened():
-            self.cap.release()
-        cv2.destroyAllWindows()
+        if self.capture is not None:
+            self.capture.stop()
+            self.capture = None
+        if self.source is not None and self.source.isOpened():
+            self.source.release()
+        try:
+            cv2.destroyAllWindows()
+        except cv2.error:
+            # opencv-python-headless has no GUI backend
+            pass
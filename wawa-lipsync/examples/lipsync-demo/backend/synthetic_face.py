@@ -0,0 +1,38 @@
+import cv2
+import numpy as np
+from typing import List, Tuple
+
+def draw_face(image: np.ndarray, cx: int, cy: int, size: int, skin: int = 200):
+    """
+    Draw a simple frontal face (grayscale) centred on (cx, cy), `size` pixels tall.
+    Dark eyes and brows over a bright oval are enough for the cascade detectors.
+    """
+    r = size // 2
+    cv2.ellipse(image, (cx, cy), (int(r * 0.8), r), 0, 0, 360, skin, -1)
+    for side in (-0.35, 0.35):
+        ex = int(cx + side * r)
+        cv2.ellipse(image, (ex, int(cy - 0.2 * r)), (int(0.18 * r), int(0.08 * r)), 0, 0, 360, 40, -1)
+        cv2.rectangle(image, (int(ex - 0.25 * r), int(cy - 0.42 * r)), (int(ex + 0.25 * r), int(cy - 0.36 * r)), 60, -1)
+    cv2.ellipse(image, (cx, cy + int(0.1 * r)), (int(0.07 * r), int(0.15 * r)), 0, 0, 360, skin - 30, -1)
+    cv2.ellipse(image, (cx, cy + int(0.5 * r)), (int(0.3 * r), int(0.07 * r)), 0, 0, 360, 70, -1)
+
+def make_face_frames(count: int, frame_size: Tuple[int, int] = (640, 480),
+                     seed: int = 0) -> List[Tuple[np.ndarray, Tuple[int, int, int, int]]]:
+    """
+    Grayscale frames with one face at a random position and size, plus sensor noise.
+    Returns (frame, (x, y, w, h)) pairs where the box is the drawn face.
+    """
+    width, height = frame_size
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        size = int(rng.uniform(0.25, 0.5) * height)
+        cx = int(rng.uniform(size * 0.5, width - size * 0.5))
+        cy = int(rng.uniform(size * 0.5, height - size * 0.5))
+        frame = np.full((height, width), int(rng.integers(80, 140)), dtype=np.uint8)
+        draw_face(frame, cx, cy, size)
+        frame = cv2.GaussianBlur(frame, (5, 5), 0)
+        noise = rng.normal(0, 4, frame.shape)
+        frame = np.clip(frame + noise, 0, 255).astype(np.uint8)
+        frames.append((frame, (cx - size // 2, cy - size // 2, size, size)))
+    return frames
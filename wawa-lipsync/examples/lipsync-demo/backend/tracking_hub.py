@@ -0,0 +1,347 @@
+import asyncio
+import itertools
+import logging
+import time
+from typing import Callable, Dict, Optional, Union
+from simple_face_tracker import SimpleFaceTracker
+from async_tracker import AsyncFaceTracker
+from frame_scheduler import FrameScheduler
+from pose_bus import BusPoseSource
+import wire_format
+import metrics
+from avatar_controller import AvatarController
+from cpu_budget import CpuBudget
+
+logger = logging.getLogger(__name__)
+
+class PoseFrame:
+    """One published avatar pose, shared by every subscribed client."""
+
+    __slots__ = ('seq', 'timestamp', 'face_data', 'movements', '_encoded')
+
+    def __init__(self, seq: int, timestamp: float, face_data: Dict, movements: Dict):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.face_data = face_data
+        self.movements = movements
+        self._encoded = {}
+
+    def encode(self, protocol: Optional[str] = None) -> Union[str, bytes]:
+        """Serialize once per frame and wire format, no matter how many clients receive it."""
+        message = self._encoded.get(protocol)
+        if message is None:
+            start = time.perf_counter()
+            detected = bool(self.face_data and self.face_data.get('detected'))
+            message = wire_format.encode(self.seq, self.timestamp, self.movements, detected, protocol)
+            self._encoded[protocol] = message
+            metrics.observe('serialize', time.perf_counter() - start)
+        return message
+
+class SlowConsumerError(Exception):
+    """Raised when a client has lagged behind the pipeline for too long."""
+
+class Subscription:
+    """
+    Latest-value outbound slot for one client, optionally at its own rate.
+    A frame that arrives while the previous one is still being sent replaces it,
+    so a slow consumer costs at most one pending frame and never blocks the hub.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, fps: Optional[float] = None, protocol: Optional[str] = None,
+                 resolution: float = 0.1, max_lag: float = 2.0, lag_grace: float = 5.0):
+        self.id = next(self._ids)
+        # Rate the client asked for, before any cap; set by the hub
+        self.requested_fps = fps
+        self.frame = None
+        # Set by the server so the socket's write buffer can be reported
+        self.transport = None
+        self.scheduler = FrameScheduler(fps) if fps else None
+        self.protocol = protocol
+        self.encoder = wire_format.make_stream_encoder(protocol, resolution)
+        self.max_lag = max_lag
+        self.lag_grace = lag_grace
+        self.sent = 0
+        self.dropped = 0
+        self.suppressed = 0
+        self.lag = 0.0
+        self._lagging_since = None
+        self._sending = False
+        self._event = asyncio.Event()
+
+    def set_rate(self, fps: Optional[float]):
+        """Change this client's rate; None follows the pipeline rate."""
+        if fps is None:
+            self.scheduler = None
+        elif self.scheduler is None:
+            self.scheduler = FrameScheduler(fps)
+        else:
+            self.scheduler.set_rate(fps)
+
+    def offer(self, frame: PoseFrame):
+        """Replace the pending frame with a newer one."""
+        if self._sending and self._event.is_set():
+            # Still busy sending and the pending frame was never picked up
+            self.dropped += 1
+        self.frame = frame
+        self._event.set()
+
+    async def get(self) -> PoseFrame:
+        """Wait for the next frame published after the last one read."""
+        if self.scheduler is not None:
+            # Slower client: frames published in between are simply skipped
+            await self.scheduler.wait()
+        await self._event.wait()
+        self._event.clear()
+        return self.frame
+
+    async def next_frame(self):
+        """Wait for the next frame and encode it; returns (frame, message)."""
+        while True:
+            frame = await self.get()
+            if self.encoder is None:
+                return frame, frame.encode(self.protocol)
+
+            # Delta streams skip frames where nothing changed
+            start = time.perf_counter()
+            message = self.encoder.encode(frame.seq, frame.timestamp, frame.movements)
+            metrics.observe('serialize', time.perf_counter() - start)
+            if message is not None:
+                return frame, message
+            self.suppressed += 1
+
+    async def send_next(self, send: Callable):
+        """
+        Send the next frame through `send`, dropping stale frames meanwhile.
+        Raises SlowConsumerError once the client has lagged more than max_lag
+        seconds for longer than lag_grace, or a single send stalls that long.
+        """
+        frame, message = await self.next_frame()
+
+        self._sending = True
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(send(message), timeout=self.max_lag + self.lag_grace)
+        except asyncio.TimeoutError:
+            raise SlowConsumerError(f"send stalled for {self.max_lag + self.lag_grace:.1f}s")
+        finally:
+            self._sending = False
+        metrics.observe('send', time.perf_counter() - start)
+        self.sent += 1
+
+        # Lag = time from publish to the frame leaving our buffers
+        now = time.time()
+        self.lag = now - frame.timestamp
+        if self.lag <= self.max_lag:
+            self._lagging_since = None
+        elif self._lagging_since is None:
+            self._lagging_since = now
+        elif now - self._lagging_since > self.lag_grace:
+            raise SlowConsumerError(f"lag {self.lag:.2f}s for over {self.lag_grace:.1f}s")
+
+    @property
+    def pending_frames(self) -> int:
+        """Frames waiting in this client's slot (0 or 1)."""
+        return 1 if self._event.is_set() else 0
+
+    @property
+    def send_buffer_bytes(self) -> int:
+        """Bytes queued in the socket's write buffer, 0 if unknown."""
+        if self.transport is None or self.transport.is_closing():
+            return 0
+        return self.transport.get_write_buffer_size()
+
+    def stats(self) -> Dict:
+        """Per-client pacing and backpressure statistics."""
+        stats = self.scheduler.stats() if self.scheduler is not None else {}
+        stats.update({
+            'sent_frames': self.sent,
+            'dropped_frames': self.dropped,
+            'lag_ms': round(self.lag * 1000, 1)
+        })
+        if self.encoder is not None:
+            stats['suppressed_frames'] = self.suppressed
+        return stats
+
+class LocalPoseSource:
+    """Pose source that runs the tracker and controller in this process."""
+
+    def __init__(self, tracker_factory: Callable, scheduler: FrameScheduler):
+        self.tracker = AsyncFaceTracker(tracker_factory, scheduler=scheduler)
+        self.controller = AvatarController()
+
+    def start(self):
+        CpuBudget.shared().add_pipeline()
+        self.tracker.start()
+
+    async def next_pose(self):
+        """
+        Returns (seq, timestamp, face_data, movements); seq is assigned by the hub, and so is
+        the timestamp unless the frame carries its capture time.
+        """
+        # Get face position from the worker thread
+        face_data = await self.tracker.get_face_position()
+
+        # Calculate avatar movements
+        start = time.perf_counter()
+        movements = self.controller.calculate_movements(face_data)
+        metrics.observe('controller', time.perf_counter() - start)
+        return None, face_data.get('timestamp'), face_data, movements
+
+    async def release(self):
+        await self.tracker.release()
+        CpuBudget.shared().remove_pipeline()
+
+class TrackingHub:
+    """
+    Process-wide capture/detect loop.
+    Runs one tracker and one controller and fans each pose out to all subscribers,
+    so detection cost does not depend on the number of connected clients.
+    """
+
+    _shared = None
+
+    def __init__(self, tracker_factory: Callable = SimpleFaceTracker, fps: float = 30,
+                 linger: float = 5.0, max_backoff: float = 30.0):
+        self.tracker_factory = tracker_factory
+        self.scheduler = FrameScheduler(fps)
+        self.source_factory = None
+        # Keep the camera open briefly after the last client leaves (reconnects, polling)
+        self.linger = linger
+        # A failed tracker is restarted after 1s, doubling up to max_backoff while it keeps failing
+        self.max_backoff = max_backoff
+        self.subscribers = set()
+        self.latest: Optional[PoseFrame] = None
+        # Per-client rate ceiling imposed under load
+        self.rate_cap: Optional[float] = None
+        self._dropped_closed = 0
+        self._seq = 0
+        self._task = None
+        self._stop_handle = None
+        # Last pipeline failure, cleared by the next published frame
+        self.error: Optional[str] = None
+        self.restarts = 0
+
+    @classmethod
+    def shared(cls) -> 'TrackingHub':
+        """Return the hub shared by every server in this process."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def use_pose_bus(self, bus_name: str):
+        """Follow poses from a shared-memory PoseBus instead of running a tracker here."""
+        self.source_factory = lambda: BusPoseSource(bus_name, self.scheduler)
+
+    def set_rate(self, fps: float):
+        """Change the pipeline's target frame rate."""
+        self.scheduler.set_rate(fps)
+
+    def stats(self) -> Dict:
+        """Pipeline frame rate and deadline statistics."""
+        return {
+            'clients': len(self.subscribers),
+            'dropped_frames': sum(subscription.dropped for subscription in self.subscribers),
+            'error': self.error,
+            'restarts': self.restarts,
+            **self.scheduler.stats()
+        }
+
+    @property
+    def dropped_total(self) -> int:
+        """Frames dropped for slow clients since start, including departed ones."""
+        return self._dropped_closed + sum(subscription.dropped for subscription in self.subscribers)
+
+    def subscribe(self, fps: Optional[float] = None, protocol: Optional[str] = None,
+                  resolution: float = 0.1, max_lag: float = 2.0) -> Subscription:
+        """
+        Register a client and start the capture loop if it is not running.
+        Clients asking for less than the pipeline rate get their own pacing.
+        """
+        subscription = Subscription(self._client_rate(fps), protocol, resolution, max_lag)
+        subscription.requested_fps = fps
+        self.subscribers.add(subscription)
+        if self._stop_handle is not None:
+            self._stop_handle.cancel()
+            self._stop_handle = None
+        if self.latest is not None:
+            subscription.offer(self.latest)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscription
+
+    def _client_rate(self, fps: Optional[float]) -> Optional[float]:
+        if self.rate_cap is not None:
+            fps = min(fps or self.rate_cap, self.rate_cap)
+        # Only clients slower than the pipeline need their own pacing
+        if fps is not None and fps >= self.scheduler.fps:
+            return None
+        return fps
+
+    def set_client_rate(self, subscription: Subscription, fps: Optional[float]):
+        """Change a connected client's rate."""
+        subscription.requested_fps = fps
+        subscription.set_rate(self._client_rate(fps))
+
+    def set_rate_cap(self, fps: Optional[float]):
+        """Limit every client to `fps` (None lifts the cap), e.g. to shed load."""
+        self.rate_cap = fps
+        for subscription in self.subscribers:
+            subscription.set_rate(self._client_rate(subscription.requested_fps))
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a client; the camera is released once nobody is watching."""
+        if subscription in self.subscribers:
+            self.subscribers.discard(subscription)
+            self._dropped_closed += subscription.dropped
+        if not self.subscribers and self._task is not None and self._stop_handle is None:
+            self._stop_handle = asyncio.get_running_loop().call_later(self.linger, self._stop)
+
+    def _stop(self):
+        self._stop_handle = None
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _publish(self, face_data: Dict, movements: Dict, seq: Optional[int] = None,
+                 timestamp: Optional[float] = None):
+        self._seq = seq if seq is not None else self._seq + 1
+        self.latest = PoseFrame(self._seq, timestamp or time.time(), face_data, movements)
+        for subscription in self.subscribers:
+            subscription.offer(self.latest)
+
+    async def _run(self):
+        """
+        Single capture -> detect -> controller loop for the whole process.
+        If the tracker fails, the error is logged and kept for health checks,
+        and the pipeline is restarted with backoff; clients stay connected.
+        """
+        backoff = 1.0
+        while True:
+            logger.info("Starting shared tracking pipeline")
+            if self.source_factory is not None:
+                source = self.source_factory()
+            else:
+                source = LocalPoseSource(self.tracker_factory, self.scheduler)
+
+            try:
+                source.start()
+                while True:
+                    seq, timestamp, face_data, movements = await source.next_pose()
+
+                    # Publish to every client
+                    self._publish(face_data, movements, seq, timestamp)
+                    self.error = None
+                    backoff = 1.0
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                logger.error(f"Tracking pipeline failed ({self.error}); restarting in {backoff:.0f}s")
+            finally:
+                await source.release()
+                self.latest = None
+                logger.info("Shared tracking pipeline stopped")
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+            self.restarts += 1
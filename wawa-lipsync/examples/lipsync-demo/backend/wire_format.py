@@ -0,0 +1,141 @@
+import json
+import struct
+from typing import Dict, Optional, Tuple, Union
+
+# WebSocket subprotocols; clients that offer none get JSON
+JSON_PROTOCOL = 'aisha.pose.json'
+BINARY_PROTOCOL = 'aisha.pose.bin'
+DELTA_PROTOCOL = 'aisha.pose.delta'
+SUBPROTOCOLS = (BINARY_PROTOCOL, DELTA_PROTOCOL, JSON_PROTOCOL)
+
+BINARY_VERSION = 1
+
+# Little-endian, 34 bytes:
+#   B  format version
+#   I  frame sequence number
+#   d  capture timestamp (unix seconds)
+#   f  body.y, head.x, head.y, eyes.x, eyes.y (degrees)
+#   B  flags: bit 0 = blink, bit 1 = face detected
+POSE_STRUCT = struct.Struct('<BIdfffffB')
+
+FLAG_BLINK = 0x01
+FLAG_DETECTED = 0x02
+
+# Angle fields carried by every format, as (group, axis)
+POSE_FIELDS = (('body', 'y'), ('head', 'x'), ('head', 'y'), ('eyes', 'x'), ('eyes', 'y'))
+
+# Optional movements entry: the idle-animation offsets already included in each
+# POSE_FIELDS angle, so stateful encoders can tell animation from tracking
+ANIMATION_KEY = 'animation'
+NO_ANIMATION = (0.0,) * len(POSE_FIELDS)
+
+def is_binary(protocol: Optional[str]) -> bool:
+    """Whether frames for this subprotocol go out as binary messages."""
+    return protocol == BINARY_PROTOCOL
+
+def encode_json(movements: Dict) -> str:
+    """Legacy text encoding of a movement frame."""
+    return json.dumps({key: value for key, value in movements.items() if key != ANIMATION_KEY})
+
+def encode_binary(seq: int, timestamp: float, movements: Dict, detected: bool = False) -> bytes:
+    """Pack a movement frame into the fixed binary layout."""
+    flags = 0
+    if movements.get('blink'):
+        flags |= FLAG_BLINK
+    if detected:
+        flags |= FLAG_DETECTED
+
+    return POSE_STRUCT.pack(
+        BINARY_VERSION,
+        seq & 0xFFFFFFFF,
+        timestamp,
+        movements['body']['y'],
+        movements['head']['x'],
+        movements['head']['y'],
+        movements['eyes']['x'],
+        movements['eyes']['y'],
+        flags
+    )
+
+def decode_binary(data: bytes) -> Dict:
+    """Unpack a binary frame back into the JSON-shaped movement dict."""
+    version, seq, timestamp, body_y, head_x, head_y, eye_x, eye_y, flags = POSE_STRUCT.unpack(data)
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported pose frame version: {version}")
+
+    return {
+        'seq': seq,
+        'timestamp': timestamp,
+        'body': {'y': body_y},
+        'head': {'x': head_x, 'y': head_y},
+        'eyes': {'x': eye_x, 'y': eye_y},
+        'blink': bool(flags & FLAG_BLINK),
+        'detected': bool(flags & FLAG_DETECTED)
+    }
+
+def encode(seq: int, timestamp: float, movements: Dict, detected: bool,
+           protocol: Optional[str]) -> Union[str, bytes]:
+    """Encode a frame for the negotiated subprotocol."""
+    if is_binary(protocol):
+        return encode_binary(seq, timestamp, movements, detected)
+    return encode_json(movements)
+
+class DeltaEncoder:
+    """
+    Per-client delta stream (aisha.pose.delta).
+    Angles are quantized to integer steps of `resolution` degrees and only fields whose
+    step changed are sent. Frames with no change are suppressed, and a full keyframe goes
+    out first and then every `keyframe_interval` seconds so a client can always resync.
+    Multiply a step by the keyframe's "r" to get degrees.
+
+    The controller's idle animation (breathing, eye drift; the ANIMATION_KEY layer) is
+    left out: it would change some field on almost every frame of a still face, so
+    delta clients animate idle motion themselves. Blinks are still sent.
+
+    Keyframe: {"k":1,"r":0.1,"s":seq,"body":{"y":..},"head":{..},"eyes":{..},"blink":false}
+    Delta:    {"s":seq,"head":{"x":..}}  (merge into the last known pose)
+    """
+
+    def __init__(self, resolution: float = 0.1, keyframe_interval: float = 2.0):
+        if resolution <= 0:
+            raise ValueError(f"delta resolution must be positive, got {resolution}")
+        self.resolution = resolution
+        self.keyframe_interval = keyframe_interval
+        self._last = None
+        self._keyframe_at = None
+
+    def quantize(self, movements: Dict) -> Tuple[int, ...]:
+        """Steps of each POSE_FIELDS angle, without the animation layer."""
+        animation = movements.get(ANIMATION_KEY) or NO_ANIMATION
+        return tuple(round((movements[group][axis] - offset) / self.resolution)
+                     for (group, axis), offset in zip(POSE_FIELDS, animation))
+
+    def encode(self, seq: int, timestamp: float, movements: Dict) -> Optional[str]:
+        """Encode a frame, or return None when nothing changed."""
+        steps = self.quantize(movements)
+        blink = bool(movements.get('blink'))
+        state = steps + (blink,)
+
+        keyframe = self._last is None or timestamp - self._keyframe_at >= self.keyframe_interval
+        if keyframe:
+            message = {'k': 1, 'r': self.resolution, 's': seq, 'blink': blink}
+            self._keyframe_at = timestamp
+        elif state == self._last:
+            return None
+        else:
+            message = {'s': seq}
+            if blink != self._last[-1]:
+                message['blink'] = blink
+
+        for i, (group, axis) in enumerate(POSE_FIELDS):
+            if keyframe or steps[i] != self._last[i]:
+                message.setdefault(group, {})[axis] = steps[i]
+
+        self._last = state
+        return json.dumps(message, separators=(',', ':'))
+
+def make_stream_encoder(protocol: Optional[str], resolution: float = 0.1):
+    """Per-client encoder for stateful formats; None for shared per-frame formats."""
+    if protocol == DELTA_PROTOCOL:
+        return DeltaEncoder(resolution)
+    return None
@@ -11,7 +11,8 @@ import os
 # Add backend directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
-from websocket_server import TrackingServer
+from aiohttp_server import TrackingServer
+from multi_worker import serve_multi_worker
 
 def main():
     print("=" * 60)
@@ -25,7 +26,14 @@ def main():
     print("Press Ctrl+C to stop the server.")
     print()
 
+    workers = int(os.environ.get('TRACKING_WORKERS', 1))
+
     try:
+        if workers > 1:
+            print(f"Running {workers} server workers (TRACKING_WORKERS)")
+            print()
+            serve_multi_worker('0.0.0.0', int(os.environ.get('PORT', 8765)), workers)
+            return
         server = TrackingServer()
         asyncio.run(server.start())
     except KeyboardInterrupt:
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the tracking server's admission control (no server or camera needed).
+Run with: python -m pytest test_admission.py  (or python test_admission.py)
+"""
+
+import os
+import sys
+import unittest
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from admission import AdmissionController
+from metrics import LoopLagMonitor
+
+def make_controller(**kwargs):
+    caps = []
+    controller = AdmissionController(LoopLagMonitor(), caps.append, pipeline_fps=30, **kwargs)
+    return controller, caps
+
+def lagging(controller, lag=0.5):
+    """Report one loop-lag sample over the limit."""
+    controller.loop_lag.peak = lag
+    controller.sample()
+
+class AdmissionControllerTest(unittest.TestCase):
+
+    def test_burst_never_exceeds_max_clients(self):
+        controller, _ = make_controller(max_clients=3)
+        admitted = [controller.admit() is None for _ in range(200)]
+        self.assertEqual(sum(admitted), 3)
+        self.assertEqual(controller.connections, 3)
+        self.assertEqual(controller.rejected, 197)
+
+    def test_refusals_carry_retry_hint(self):
+        controller, _ = make_controller(max_clients=1, retry_after=7)
+        self.assertIsNone(controller.admit())
+        self.assertEqual(controller.admit(), 7)
+
+    def test_release_frees_a_slot(self):
+        controller, _ = make_controller(max_clients=2)
+        self.assertIsNone(controller.admit())
+        self.assertIsNone(controller.admit())
+        self.assertIsNotNone(controller.admit())
+        controller.release()
+        self.assertIsNone(controller.admit())
+        self.assertEqual(controller.connections, 2)
+
+    def test_lag_steps_rates_down_before_refusing(self):
+        controller, caps = make_controller(max_lag=0.1, step_interval=0)
+        lagging(controller)
+        self.assertEqual(caps, [15])
+        self.assertIsNone(controller.admit())
+        lagging(controller)
+        self.assertEqual(caps, [15, 10])
+        # The lowest rate has only just been applied; give it a chance
+        self.assertIsNone(controller.admit())
+        lagging(controller)
+        self.assertEqual(controller.admit(), 5)
+        self.assertTrue(controller.shedding)
+        self.assertEqual(caps, [15, 10])
+
+    def test_steps_wait_for_step_interval(self):
+        controller, caps = make_controller(max_lag=0.1, step_interval=60)
+        for _ in range(5):
+            lagging(controller)
+            self.assertIsNone(controller.admit())
+        self.assertEqual(controller.level, 1)
+        self.assertEqual(caps, [15])
+
+    def test_client_limit_refuses_without_stepping_rates(self):
+        controller, caps = make_controller(max_clients=1)
+        self.assertIsNone(controller.admit())
+        controller.sample()
+        self.assertIsNotNone(controller.admit())
+        self.assertEqual(caps, [])
+
+    def test_recovers_when_load_drops(self):
+        controller, caps = make_controller(max_lag=0.1, step_interval=0, recover_after=0)
+        for _ in range(3):
+            lagging(controller)
+        self.assertIsNotNone(controller.admit())
+        # Calm samples reopen admission at once, then lift the cap a step at a time
+        controller.sample()
+        self.assertIsNone(controller.admit())
+        self.assertFalse(controller.shedding)
+        for _ in range(2):
+            controller.sample()
+        self.assertEqual(controller.level, 0)
+        self.assertEqual(caps, [15, 10, 15, None])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Unit tests for decoding client-uploaded frames (no server or camera needed).
+Run with: python -m pytest test_frame_ingest.py  (or python test_frame_ingest.py)
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import frame_ingest
+from frame_ingest import FrameDecodeError, RAW_HEADER, decode_frame, jpeg_size
+
+def jpeg(width, height, progressive=False, color=True):
+    image = np.random.default_rng(0).integers(0, 255, (height, width, 3) if color else (height, width),
+                                              dtype=np.uint8)
+    params = [cv2.IMWRITE_JPEG_PROGRESSIVE, 1] if progressive else []
+    ok, data = cv2.imencode('.jpg', image, params)
+    assert ok
+    return data.tobytes()
+
+def frame_marker(data):
+    """The start-of-frame marker byte the encoder used."""
+    for marker in (0xC0, 0xC1, 0xC2):
+        if bytes([0xFF, marker]) in data:
+            return marker
+    return None
+
+def forge_size(data, width, height):
+    """Rewrite the size in the start-of-frame header, leaving the image data as it is."""
+    data = bytearray(data)
+    offset = data.index(bytes([0xFF, frame_marker(bytes(data))]))
+    data[offset + 5:offset + 9] = height.to_bytes(2, 'big') + width.to_bytes(2, 'big')
+    return bytes(data)
+
+class JpegSizeTest(unittest.TestCase):
+
+    def test_baseline(self):
+        data = jpeg(320, 240)
+        self.assertEqual(frame_marker(data), 0xC0)
+        self.assertEqual(jpeg_size(data), (320, 240))
+        self.assertEqual(decode_frame(data).shape, (240, 320))
+
+    def test_progressive(self):
+        data = jpeg(640, 480, progressive=True)
+        self.assertEqual(frame_marker(data), 0xC2)
+        self.assertEqual(jpeg_size(data), (640, 480))
+        self.assertEqual(decode_frame(data).shape, (480, 640))
+
+    def test_grayscale(self):
+        self.assertEqual(jpeg_size(jpeg(160, 120, color=False)), (160, 120))
+
+    def test_truncated_or_garbage(self):
+        data = jpeg(320, 240)
+        cut = data.index(bytes([0xFF, 0xC0]))
+        for bad in (b'\xff\xd8', b'\xff\xd8\xff', data[:cut], data[:cut + 6],
+                    b'\xff\xd8' + bytes(64), b'\xff\xd8\xff\xe0\x00\x10' + b'x' * 14):
+            with self.assertRaises(FrameDecodeError):
+                jpeg_size(bad)
+            with self.assertRaises(FrameDecodeError):
+                decode_frame(bad)
+
+    def test_oversized_refused_before_decoding(self):
+        cases = (jpeg(1280, 720), jpeg(800, 600, progressive=True),
+                 forge_size(jpeg(64, 64), 60000, 60000), forge_size(jpeg(64, 64), 0, 64))
+        with mock.patch.object(frame_ingest.cv2, 'imdecode') as imdecode:
+            for data in cases:
+                with self.assertRaises(FrameDecodeError):
+                    decode_frame(data)
+            imdecode.assert_not_called()
+
+    def test_size_at_limit_is_decoded(self):
+        self.assertEqual(decode_frame(jpeg(640, 480)).shape, (480, 640))
+
+class RawFrameTest(unittest.TestCase):
+
+    def test_raw_frame_is_a_view(self):
+        data = RAW_HEADER.pack(4, 2) + bytes(range(8))
+        gray = decode_frame(data)
+        self.assertEqual(gray.shape, (2, 4))
+        self.assertEqual(gray[1, 3], 7)
+
+    def test_raw_frame_size_checked(self):
+        for data in (RAW_HEADER.pack(4, 2) + bytes(7), RAW_HEADER.pack(0, 2), RAW_HEADER.pack(1000, 1000), b'\x01'):
+            with self.assertRaises(FrameDecodeError):
+                decode_frame(data)
+
+if __name__ == '__main__':
+    unittest.main()
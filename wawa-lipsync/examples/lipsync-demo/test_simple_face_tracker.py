@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for SimpleFaceTracker's detection options, on synthetic frames (no camera needed).
+Run with: python -m pytest test_simple_face_tracker.py  (or python test_simple_face_tracker.py)
+"""
+
+import os
+import sys
+import unittest
+import cv2
+import numpy as np
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from face_detectors import default_detector
+import simple_face_tracker
+from simple_face_tracker import SimpleFaceTracker
+from synthetic_face import draw_face, make_face_frames
+
+class RecordingDetector:
+    """Wraps the default detector and records the size of every image it is given."""
+
+    def __init__(self):
+        self.detector = default_detector()
+        self.name = self.detector.name
+        self.shapes = []
+
+    def detect_all(self, gray, *args, **kwargs):
+        self.shapes.append(gray.shape)
+        return self.detector.detect_all(gray, *args, **kwargs)
+
+def make_tracker(detector, **kwargs):
+    return SimpleFaceTracker(camera_index=None, detector=detector, track=False, motion_threshold=0,
+                             target_fps=0, **kwargs)
+
+def drifting_face(frames: int, speed: float = 0.3, seed: int = 0):
+    """Frames of one face sliding right by `speed` pixels per frame, with its true centre x."""
+    rng = np.random.default_rng(seed)
+    for i in range(frames):
+        cx = 200 + i * speed
+        frame = np.full((480, 640), 110, dtype=np.uint8)
+        draw_face(frame, int(round(cx)), 240, 200)
+        frame = cv2.GaussianBlur(frame, (5, 5), 0)
+        yield np.clip(frame + rng.normal(0, 2, frame.shape), 0, 255).astype(np.uint8), cx
+
+class DetectionRefineTest(unittest.TestCase):
+
+    def test_refine_rescans_roi_at_full_resolution(self):
+        frame, (x, y, w, h) = make_face_frames(1, seed=3)[0]
+        detector = RecordingDetector()
+        tracker = make_tracker(detector, detection_scale=0.4, refine=True)
+
+        face = tracker._detect(frame)
+
+        self.assertIsNotNone(face)
+        # Downscaled full-frame scan, then a window around the face at full resolution
+        self.assertEqual(detector.shapes[0], (192, 256))
+        self.assertEqual(len(detector.shapes), 2)
+        window = detector.shapes[1]
+        self.assertLess(window[0] * window[1], frame.size)
+        # At full resolution the window holds the whole face
+        self.assertGreater(window[0], h)
+        for found, expected in zip(face, (x, y, w, h)):
+            self.assertLess(abs(found - expected), 0.15 * h)
+
+    def test_no_refine_scans_once(self):
+        frame, _ = make_face_frames(1, seed=3)[0]
+        detector = RecordingDetector()
+        tracker = make_tracker(detector, detection_scale=0.4, refine=False)
+        self.assertIsNotNone(tracker._detect(frame))
+        self.assertEqual(detector.shapes, [(192, 256)])
+
+    def test_refine_defaults_to_environment(self):
+        detector = RecordingDetector()
+        saved = simple_face_tracker.DETECTION_REFINE
+        try:
+            simple_face_tracker.DETECTION_REFINE = True
+            self.assertTrue(make_tracker(detector).refine)
+            self.assertFalse(make_tracker(detector, refine=False).refine)
+        finally:
+            simple_face_tracker.DETECTION_REFINE = saved
+
+class MotionGateTest(unittest.TestCase):
+
+    def run_drift(self, motion_threshold):
+        tracker = SimpleFaceTracker(camera_index=None, target_fps=0, motion_threshold=motion_threshold)
+        errors = []
+        for frame, cx in drifting_face(120):
+            face = tracker._find_face(frame)
+            self.assertIsNotNone(face)
+            errors.append(abs(face[0] + face[2] / 2 - cx))
+            if tracker.flow.points is not None:
+                # Whatever resolved the frame, the next flow step starts from it
+                self.assertTrue(np.array_equal(tracker.flow._prev, frame))
+        return tracker, max(errors)
+
+    def test_gate_skips_detector_but_follows_slow_drift(self):
+        gated, gated_error = self.run_drift(2.0)
+        ungated, ungated_error = self.run_drift(0)
+        self.assertGreater(gated.gated_frames, 60)
+        self.assertLess(gated.full_scans + gated.roi_scans, ungated.full_scans + ungated.roi_scans)
+        # Reusing the box instead of following the face would leave it pixels behind
+        self.assertLessEqual(gated_error, max(ungated_error, 2.5))
+
+    def test_threshold_defaults_to_environment(self):
+        saved = simple_face_tracker.MOTION_THRESHOLD
+        try:
+            simple_face_tracker.MOTION_THRESHOLD = 0
+            self.assertEqual(SimpleFaceTracker(camera_index=None, target_fps=0).motion_threshold, 0)
+        finally:
+            simple_face_tracker.MOTION_THRESHOLD = saved
+
+if __name__ == '__main__':
+    unittest.main()
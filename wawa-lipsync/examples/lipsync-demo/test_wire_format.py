@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the delta wire format (no server or camera needed).
+Run with: python -m pytest test_wire_format.py  (or python test_wire_format.py)
+"""
+
+import json
+import os
+import sys
+import unittest
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from wire_format import DeltaEncoder, ANIMATION_KEY, POSE_FIELDS, encode_json
+
+def pose(body_y=0.0, head_x=0.0, head_y=0.0, eye_x=0.0, eye_y=0.0, blink=False, animation=None):
+    movements = {
+        'body': {'y': body_y},
+        'head': {'x': head_x, 'y': head_y},
+        'eyes': {'x': eye_x, 'y': eye_y},
+        'blink': blink
+    }
+    if animation is not None:
+        movements[ANIMATION_KEY] = animation
+    return movements
+
+def degrees(message):
+    """Apply a keyframe's resolution to its steps."""
+    return {group: {axis: steps * message['r'] for axis, steps in message[group].items()}
+            for group, _ in POSE_FIELDS}
+
+class DeltaEncoderTest(unittest.TestCase):
+
+    def test_quantize_round_trip(self):
+        for resolution, value in ((0.25, 0.75), (0.25, -1.25), (0.1, 0.3), (0.5, 12.5), (2.0, 44.0)):
+            encoder = DeltaEncoder(resolution)
+            message = json.loads(encoder.encode(1, 0.0, pose(head_x=value)))
+            self.assertEqual(message['r'], resolution)
+            self.assertIsInstance(message['head']['x'], int)
+            self.assertAlmostEqual(degrees(message)['head']['x'], value)
+
+    def test_quantize_rounds_to_nearest_step(self):
+        encoder = DeltaEncoder(0.25)
+        self.assertEqual(encoder.quantize(pose(head_x=0.8, head_y=0.1, eye_x=-0.13)), (0, 3, 0, -1, 0))
+
+    def test_rejects_non_positive_resolution(self):
+        for resolution in (0, -0.1):
+            with self.assertRaises(ValueError):
+                DeltaEncoder(resolution)
+
+    def test_unchanged_frame_is_suppressed(self):
+        encoder = DeltaEncoder(0.1, keyframe_interval=2.0)
+        self.assertIsNotNone(encoder.encode(1, 0.0, pose(head_x=5.0)))
+        # Below half a step is no change
+        self.assertIsNone(encoder.encode(2, 0.1, pose(head_x=5.04)))
+        message = json.loads(encoder.encode(3, 0.2, pose(head_x=5.2)))
+        self.assertEqual(message, {'s': 3, 'head': {'x': 52}})
+
+    def test_blink_is_sent(self):
+        encoder = DeltaEncoder(0.1)
+        encoder.encode(1, 0.0, pose())
+        self.assertEqual(json.loads(encoder.encode(2, 0.1, pose(blink=True))), {'s': 2, 'blink': True})
+
+    def test_animation_layer_does_not_count_as_change(self):
+        encoder = DeltaEncoder(0.1)
+        first = json.loads(encoder.encode(1, 0.0, pose(head_y=4.0, animation=(0, 0, 4.0, 0, 0))))
+        self.assertEqual(first['head']['y'], 0)
+        self.assertIsNone(encoder.encode(2, 0.1, pose(head_y=-3.0, eye_x=1.1, animation=(0, 0, -3.0, 1.1, 0))))
+
+    def test_keyframe_refresh(self):
+        encoder = DeltaEncoder(0.1, keyframe_interval=2.0)
+        first = json.loads(encoder.encode(1, 0.0, pose(head_x=1.0)))
+        self.assertEqual(first['k'], 1)
+        self.assertIsNone(encoder.encode(2, 1.9, pose(head_x=1.0)))
+        # Unchanged, but due for a keyframe: every field goes out again
+        refresh = json.loads(encoder.encode(3, 2.0, pose(head_x=1.0)))
+        self.assertEqual(refresh['k'], 1)
+        self.assertEqual(refresh['s'], 3)
+        self.assertEqual(refresh['body'], {'y': 0})
+        self.assertEqual(refresh['head'], {'x': 10, 'y': 0})
+
+    def test_json_leaves_out_animation_layer(self):
+        self.assertNotIn(ANIMATION_KEY, json.loads(encode_json(pose(animation=(0, 0, 1, 0, 0)))))
+
+if __name__ == '__main__':
+    unittest.main()